@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+import multiprocessing
+import time
+import traceback
+import numpy
+from multiprocessing.sharedctypes import RawArray
+from ROM import ROM
+from NES import NES
+from ppu.PPU import PPU
+from Memory import Memory
+
+
+"""
+BatchJob
+
+Descripción: Trabajo para BatchPool: ejecutar "frames" frames de la ROM
+"rom_file" con la entrada "inputs" del Joypad 1, una lista con la máscara de
+botones (Joypad.BUTTON_*) de cada frame. Si la lista es más corta que el número
+de frames, el último valor se mantiene hasta el final
+"""
+class BatchJob(object):
+
+    def __init__(self, rom_file, frames, inputs=None):
+        self._rom_file = rom_file
+        self._frames = frames
+        self._inputs = inputs or []
+
+    def get_rom_file(self):
+        return self._rom_file
+
+    def get_frames(self):
+        return self._frames
+
+    def get_inputs(self):
+        return self._inputs
+
+
+"""
+BatchPool
+
+Descripción: Ejecuta muchos trabajos BatchJob en paralelo en varios procesos.
+La NES es Python puro y de un solo hilo, así que con hilos el GIL no deja
+escalar; cada proceso ejecuta sus trabajos de uno en uno. La imagen final y la
+RAM de cada trabajo se escriben directamente en memoria compartida, indexadas
+por el número de trabajo, y sólo vuelve por pickle un pequeño resumen.
+Los procesos se crean con fork, por lo que heredan la memoria compartida
+"""
+class BatchPool(object):
+
+    def __init__(self, processes=None, fast_cpu=True):
+        # Número de procesos. Por defecto uno por núcleo
+        self._processes = processes or multiprocessing.cpu_count()
+        self._fast_cpu = fast_cpu
+
+
+    ###############################################################################
+    # Función: run(jobs, frame, ram)
+    # Parámetros:
+    #   jobs -> lista de BatchJob
+    #   frame -> si se devuelve la imagen final de cada trabajo
+    #   ram -> si se devuelve la RAM final de cada trabajo
+    # Descripción: Ejecuta los trabajos y devuelve una tupla (frames, rams, results):
+    #   frames -> array (len(jobs), 240, 256) de colores ARGB, o None
+    #   rams -> array (len(jobs), 2048) de bytes, o None
+    #   results -> lista con un diccionario por trabajo con los ciclos ejecutados
+    #              ("cycles"), el tiempo ("time") y el error si lo ha habido ("error")
+    # Los arrays son vistas de NumPy sobre la memoria compartida
+    ###############################################################################
+    def run(self, jobs, frame=True, ram=True):
+        count = len(jobs)
+        frame_size = PPU.FRAME_HEIGHT * PPU.FRAME_WIDTH
+
+        frames_buffer = RawArray("I", count * frame_size if frame else 0)
+        rams_buffer = RawArray("B", count * Memory.RAM_SIZE if ram else 0)
+
+        pool = multiprocessing.Pool(min(self._processes, max(count, 1)), _init_worker,
+                                    (frames_buffer, rams_buffer, self._fast_cpu))
+        try:
+            results = [None] * count
+            for index, result in pool.imap_unordered(_run_job, enumerate(jobs)):
+                results[index] = result
+        finally:
+            pool.close()
+            pool.join()
+
+        frames = None
+        if frame:
+            frames = numpy.frombuffer(frames_buffer, dtype=numpy.uint32).reshape(count, PPU.FRAME_HEIGHT, PPU.FRAME_WIDTH)
+
+        rams = None
+        if ram:
+            rams = numpy.frombuffer(rams_buffer, dtype=numpy.uint8).reshape(count, Memory.RAM_SIZE)
+
+        return frames, rams, results
+
+
+###############################################################################
+# Funciones de los procesos de trabajo
+###############################################################################
+
+# Estado de cada proceso: memoria compartida de salida y ROMs ya cargadas
+_worker = {}
+
+
+def _init_worker(frames_buffer, rams_buffer, fast_cpu):
+    _worker["frames"] = numpy.frombuffer(frames_buffer, dtype=numpy.uint32).reshape(-1, PPU.FRAME_HEIGHT, PPU.FRAME_WIDTH)
+    _worker["rams"] = numpy.frombuffer(rams_buffer, dtype=numpy.uint8).reshape(-1, Memory.RAM_SIZE)
+    _worker["fast_cpu"] = fast_cpu
+    _worker["roms"] = {}
+
+
+# Ejecuta el trabajo número "index" y devuelve (index, resumen)
+def _run_job(args):
+    index, job = args
+    result = {"cycles": 0, "time": 0.0, "error": None}
+    t = time.time()
+
+    try:
+        # La ROM se carga una sola vez por proceso y se comparte entre sus trabajos. Se
+        # proyecta en memoria, así que todos los procesos comparten las páginas del fichero
+        roms = _worker["roms"]
+        rom = roms.get(job.get_rom_file())
+        if rom is None:
+            rom = roms[job.get_rom_file()] = ROM(job.get_rom_file(), use_mmap=True)
+
+        nes = NES(None, headless=True, fast_cpu=_worker["fast_cpu"], rom=rom)
+        joypad = nes.get_joypad_1()
+        inputs = job.get_inputs()
+
+        for n in xrange(job.get_frames()):
+            if n < len(inputs):
+                joypad.set_buttons(inputs[n])
+            result["cycles"] += nes.step_frame()
+
+        if len(_worker["frames"]):
+            _worker["frames"][index] = nes.get_frame()
+        if len(_worker["rams"]):
+            _worker["rams"][index] = numpy.frombuffer(nes.get_ram(), dtype=numpy.uint8)
+    except Exception:
+        result["error"] = traceback.format_exc()
+
+    result["time"] = time.time() - t
+
+    return index, result
+
+
+###############################################################################
+# Inicio del programa: ejecuta "trabajos" copias de una ROM durante "frames"
+# frames con 1, 2, 4... procesos hasta "procesos" y muestra la escalabilidad
+#
+# Uso: python BatchPool.py rom frames trabajos [procesos]
+###############################################################################
+if __name__ == "__main__":
+    import sys
+
+    file_name = sys.argv[1]
+    frames = int(sys.argv[2])
+    count = int(sys.argv[3])
+    max_processes = int(sys.argv[4]) if len(sys.argv) > 4 else multiprocessing.cpu_count()
+
+    jobs = [BatchJob(file_name, frames) for n in range(count)]
+
+    processes = 1
+    base = None
+    while processes <= max_processes:
+        t = time.time()
+        frames_out, rams_out, results = BatchPool(processes).run(jobs)
+        t = time.time() - t
+
+        errors = [r["error"] for r in results if r["error"]]
+        if errors:
+            print errors[0]
+            break
+
+        base = base or t
+        print "%3d procesos: %7.2f s  %7.1f frames/s  x%.2f" % (processes, t, count * frames / t, base / t)
+        processes *= 2
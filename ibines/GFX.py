@@ -1,11 +1,18 @@
 # -*- coding: utf-8 -*-
 
-import sdl2.ext
 import time
 import array
-from sdl2 import *
+import numpy
 from ctypes import *
 
+# SDL sólo es necesario para el motor gráfico con ventana. Si no está instalado
+# se puede seguir usando el emulador en modo "headless" (sin ventana)
+try:
+    import sdl2.ext
+    from sdl2 import *
+except ImportError:
+    sdl2 = None
+
 """
 GFX
 
@@ -14,15 +21,45 @@ implementación inicial utiliza SDL a través de PyGame.
 """
 
 class GFX(object):
+
+    FRAME_WIDTH = 256
+    FRAME_HEIGHT = 240
+
+    # Los colores son enteros de 32 bits en formato ARGB
     def __init__(self):
         self._viewport_width = 1024
         self._viewport_height = 960
 
-    def draw_pixel(self, x, y, color=(0, 0, 0)):
-        pass
+        # Información de los pixeles. Almacena los pixeles en un array líneal en el que cada
+        # posición es un píxel representado por un entero de 32 bits en formato ARGB
+        self._pixels = array.array("I", [0]) * (GFX.FRAME_WIDTH * GFX.FRAME_HEIGHT)
 
-    def fill(self, color=(0, 0, 0)):
-        pass
+        # Vista de NumPy sobre el array de pixeles (sin copia) indexada por [y][x], para
+        # escribir líneas o frames completos de una vez
+        self._frame = numpy.frombuffer(self._pixels, dtype=numpy.uint32).reshape(GFX.FRAME_HEIGHT, GFX.FRAME_WIDTH)
+
+    def draw_pixel(self, x, y, color=0xFF000000):
+        self._pixels[(y << 8) | x] = color
+
+    # Pinta la línea "y" completa con 256 colores
+    def draw_line(self, y, colors):
+        self._frame[y] = colors
+
+    # Pinta el frame completo con un array de 240x256 colores
+    def draw_frame(self, colors):
+        self._frame[:] = colors
+
+    def fill(self, color=0xFF000000):
+        self._frame.fill(color)
+
+    # Devuelve la vista de NumPy de 240x256 sobre los pixeles del frame. Lo que se
+    # escriba en ella se vuelca en el siguiente update()
+    def get_frame(self):
+        return self._frame
+
+    # Devuelve el array de pixeles del frame
+    def get_pixels(self):
+        return self._pixels
 
     def clear(self):
         pass
@@ -31,6 +68,27 @@ class GFX(object):
         pass
 
 
+# Motor gráfico sin ventana. Pinta los pixeles en un array en memoria en el mismo formato
+# ARGB que GFX_PySdl2 pero sin depender de SDL, de forma que se puede ejecutar el emulador
+# en servidores o en procesos por lotes
+class GFX_Headless(GFX):
+
+    def __init__(self):
+        super(GFX_Headless, self).__init__()
+
+        # Número de frames volcados
+        self._frames = 0
+
+
+    def update(self):
+        self._frames += 1
+
+
+    # Devuelve el número de frames volcados
+    def get_frames(self):
+        return self._frames
+
+
 class GFX_PySdl2(GFX):
 
     def __init__(self):
@@ -51,10 +109,6 @@ class GFX_PySdl2(GFX):
         # Textura que almacenará la información de los pixels
         self._texture = SDL_CreateTextureFromSurface(self._renderer, self._surface)
 
-        # Información de los pixeles. Almacena los pixeles en un array líneal en el que cada
-        # posición es un píxel representado por un entero de 32 bits en formato ARGB
-        self._pixels = array.array("I", [0] * 61440)
-
         # Actualiza la textura con el array de pixeles. El último parámetro es el número
         # de bytes que tiene una lñínea hortizontal (256*4=1024)
         SDL_UpdateTexture(self._texture, None, self._pixels.buffer_info()[0], 1024)
@@ -66,22 +120,6 @@ class GFX_PySdl2(GFX):
         SDL_RenderPresent(self._renderer)
 
 
-    def draw_pixel(self, x, y, color=(0, 0, 0)):
-        # Calcula la posición x,y del pixel en el array lineal de pixeles
-        p = (y << 8) | x
-
-        v = 0xFF000000 | color[0] << 16 | color[1] << 8 | color[2]
-
-        # Asigna el valos del pixel como un entero de 32 bits con formato ARGB
-        self._pixels[p] = v
-
-
-    def fill(self, color):
-        v = 0xFF000000 | color[0] << 16 | color[1] << 8 | color[2]
-        for p in xrange(len(self._pixels)):
-            self._pixels[p] = v
-
-
     def clear(self):
         SDL_RenderClear(self._renderer)
 
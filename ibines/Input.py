@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+import nesutils
+
 # Clase que representa de forma genérica un dispositivo de entrada
 class Input(object):
     def __init__(self):
@@ -11,6 +13,22 @@ class Input(object):
 
 # Clase que representa un Joypad
 class Joypad(Input):
+
+    # Bits de cada botón en una máscara de botones, en el orden en que se leen del registro
+    BUTTON_A = 0x01
+    BUTTON_B = 0x02
+    BUTTON_SELECT = 0x04
+    BUTTON_START = 0x08
+    BUTTON_UP = 0x10
+    BUTTON_DOWN = 0x20
+    BUTTON_LEFT = 0x40
+    BUTTON_RIGHT = 0x80
+
+    # Campos del estado guardado con save_state
+    STATE_FIELDS = [("_read_count", "B"), ("_write", "B"),
+                    ("_up", "B"), ("_down", "B"), ("_left", "B"), ("_right", "B"),
+                    ("_a", "B"), ("_b", "B"), ("_select", "B"), ("_start", "B")]
+
     def __init__(self):
         super(Joypad, self).__init__()
 
@@ -83,13 +101,31 @@ class Joypad(Input):
 
 
     def set_select(self, v):
-        self._selct = v
+        self._select = v
 
 
     def set_start(self, v):
         self._start = v
 
 
+    # Establece todos los botones a partir de una máscara de bits BUTTON_*
+    def set_buttons(self, mask):
+        self._a = mask & 0x01
+        self._b = (mask >> 1) & 0x01
+        self._select = (mask >> 2) & 0x01
+        self._start = (mask >> 3) & 0x01
+        self._up = (mask >> 4) & 0x01
+        self._down = (mask >> 5) & 0x01
+        self._left = (mask >> 6) & 0x01
+        self._right = (mask >> 7) & 0x01
+
+
+    # Devuelve la máscara de bits BUTTON_* de los botones pulsados
+    def get_buttons(self):
+        return ((self._a & 0x01) | (self._b & 0x01) << 1 | (self._select & 0x01) << 2 | (self._start & 0x01) << 3 |
+                (self._up & 0x01) << 4 | (self._down & 0x01) << 5 | (self._left & 0x01) << 6 | (self._right & 0x01) << 7)
+
+
     def get_up(self):
         return self._up
 
@@ -119,4 +155,14 @@ class Joypad(Input):
 
 
     def get_start(self):
-        return self._start
\ No newline at end of file
+        return self._start
+
+
+    # Devuelve el estado del joypad en binario
+    def get_state(self):
+        return nesutils.pack_fields(self, Joypad.STATE_FIELDS)
+
+
+    # Restaura el estado devuelto por get_state
+    def set_state(self, data):
+        nesutils.unpack_fields(self, Joypad.STATE_FIELDS, data)
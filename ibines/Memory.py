@@ -1,5 +1,29 @@
 # -*- coding: utf-8 -*-
 
+###############################################################################
+# Clase: HandlerPage
+# Descripción: Página de 256 bytes de la tabla de páginas cuyo acceso se
+# redirige a funciones (registros I/O, escrituras al mapper...). Se indexa igual
+# que las páginas de datos, así que la memoria no distingue entre ambas.
+# Las funciones reciben la dirección completa de 16 bits
+###############################################################################
+class HandlerPage(object):
+
+    def __init__(self, base, read=None, write=None):
+        self._base = base           # Dirección del primer byte de la página
+        self._read = read           # read(addr) -> dato
+        self._write = write         # write(data, addr)
+
+    def __getitem__(self, offset):
+        if self._read is None:
+            return 0x00
+        return self._read(self._base | offset)
+
+    def __setitem__(self, offset, data):
+        if self._write is not None:
+            self._write(data, self._base | offset)
+
+
 ###############################################################################
 # Clase: NES
 # Descripción: Implementa la memoria principal de la NES
@@ -8,15 +32,60 @@ class Memory(object):
 
     SIZE = 0x10000
 
+    # Tamaño de las páginas de la tabla de páginas
+    PAGE_SIZE = 0x100
+    PAGE_COUNT = SIZE / PAGE_SIZE
+
+    RAM_SIZE = 0x0800
+    SRAM_SIZE = 0x2000
+
     # Constructor
     # Se le pasa una instancia de la PPU y otra de la ROM para el mapeo en memoria de ambos
     def __init__(self, ppu, mapper, joypad_1):
-        # Array para almacenar el contenido de la memoria
-        self._memory = [0x00] * Memory.SIZE
         self._joypad_1 = joypad_1
         self._ppu = ppu
         self._mapper = mapper
 
+        # Tablas de páginas de lectura y escritura. Cada entrada es una página de
+        # 256 bytes, bien de datos (bytearray) o bien un HandlerPage, de forma que
+        # cualquier acceso es table[addr >> 8][addr & 0xFF]
+        self._read_pages = [None] * Memory.PAGE_COUNT
+        self._write_pages = [None] * Memory.PAGE_COUNT
+
+        # Memoria RAM de 2KB. Los espejos de 0x0800-0x1FFF comparten las mismas 8
+        # páginas, así que cualquier dirección accede a la posición addr & 0x7FF
+        self._ram = [bytearray(Memory.PAGE_SIZE) for n in range(Memory.RAM_SIZE / Memory.PAGE_SIZE)]
+        for n in range(0x00, 0x20):
+            self._read_pages[n] = self._write_pages[n] = self._ram[n & 0x07]
+
+        # Registros de la PPU
+        for n in range(0x20, 0x40):
+            self._read_pages[n] = HandlerPage(n << 8, read=self._read_ppu_reg)
+            self._write_pages[n] = HandlerPage(n << 8, write=self._write_ppu_reg)
+
+        # Más registros I/O
+        self._read_pages[0x40] = HandlerPage(0x4000, read=self._read_io_reg)
+        self._write_pages[0x40] = HandlerPage(0x4000, write=self._write_io_reg)
+
+        # Zona sin mapear
+        empty_page = bytearray(Memory.PAGE_SIZE)
+        for n in range(0x41, 0x60):
+            self._read_pages[n] = empty_page
+            self._write_pages[n] = bytearray(Memory.PAGE_SIZE)
+
+        # Memoria de estado de la partida
+        self._sram = [bytearray(Memory.PAGE_SIZE) for n in range(Memory.SRAM_SIZE / Memory.PAGE_SIZE)]
+        for n in range(0x60, 0x80):
+            self._read_pages[n] = self._write_pages[n] = self._sram[n - 0x60]
+
+        # Memoria de programa. Las lecturas son páginas de los bancos PRG que
+        # coloca el mapper y las escrituras van a sus registros
+        for n in range(0x80, 0x100):
+            self._read_pages[n] = empty_page
+            self._write_pages[n] = HandlerPage(n << 8, write=self._write_prg)
+
+        self._mapper.set_memory(self)
+
 
     ###############################################################################
     # Función: read(addr)
@@ -26,22 +95,7 @@ class Memory(object):
     # tiene que se un número de 16 bits, y devuelve el contenido
     ###############################################################################
     def read_data(self, addr):
-        d = 0x00
-        if addr >= 0x8000:      # Memoria del programa. Lee del mapper de la ROM
-            d = self._mapper.read_prg(addr)
-        elif addr >= 0x0000 and addr < 0x2000:      # Memoria RAM
-            d = self._memory[addr]
-        elif addr >= 0x2000 and addr < 0x4000:     # Direcciones de los registros PPU
-            d = self._ppu.read_reg(0x2000 + (addr & 0x07))
-        elif addr >= 0x4000 and addr < 0x4020:      # Más registros I/O
-            if addr == 0x4016:      # Registro del Joypad 1
-                d = self._joypad_1.read_reg()
-            elif addr == 0x4017:        # Registro del Joypad 2
-                pass
-        elif 0x6000 <= addr <= 0x7FFF:      # Memoria de estado de la partida.
-            d = self._memory[addr]
-
-        return d
+        return self._read_pages[(addr >> 8) & 0xFF][addr & 0xFF]
 
 
     ###############################################################################
@@ -52,28 +106,75 @@ class Memory(object):
     # Descripción: Escribe el dato 'data' en la posición de memoria 'addr'
     ###############################################################################
     def write_data(self, data, addr):
-        d = data & 0xFF
-        addr = addr & 0xFFFF
-
-        if addr >= 0x0000 and addr < 0x2000:        # Espacio de memoria RAM
-            n = addr & 0x7FF
-            self._memory[n] = d
-            self._memory[0x0800 + n] = d
-            self._memory[0x1000 + n] = d
-            self._memory[0x1800 + n] = d
-        elif addr >= 0x2000 and addr < 0x4000:      # Direcciones de los registros PPU
-            n = 0x2000 + (addr & 0x07)
-            self._ppu.write_reg(d, n)
-        elif addr >= 0x4000 and addr <= 0x401F:     # Más registros I/O
-            if addr == 0x4014:      # Escritura de memoria de Sprites por DMA
-                self._ppu.write_sprite_dma(self, d)
-            elif addr == 0x4016:        # Joypad 1
-                self._joypad_1.write_reg(d)
-            elif addr == 0x4017:        # Joypad 2
-                pass
-        elif 0x6000 <= addr <= 0x7FFF:
-            self._memory[addr] = d
-        elif addr >= 0x8000:            # Memoria de programa. Escribe al mapper.
-            self._mapper.write_prg(d, addr)
-            # reseteamos la cache de Tiles por si hay un cambio de banco en el Mapper
-            self._ppu.reset_tiles_cache()
+        self._write_pages[(addr >> 8) & 0xFF][addr & 0xFF] = data & 0xFF
+
+
+    # Devuelve una copia de los 2KB de memoria RAM
+    def get_ram(self):
+        return bytearray().join(self._ram)
+
+
+    # Devuelve el estado de la memoria en binario: los 2KB de RAM y los 8KB de memoria
+    # de estado de la partida, sin los espejos
+    def get_state(self):
+        return str(bytearray().join(self._ram + self._sram))
+
+
+    # Restaura el estado devuelto por get_state. Se escribe en las páginas existentes,
+    # ya que la CPU y las tablas de páginas las referencian
+    def set_state(self, data):
+        pages = self._ram + self._sram
+        for n in range(len(pages)):
+            pages[n][:] = data[n * Memory.PAGE_SIZE:(n + 1) * Memory.PAGE_SIZE]
+
+
+    # Devuelve las tablas de páginas de lectura y escritura
+    def get_read_pages(self):
+        return self._read_pages
+
+    def get_write_pages(self):
+        return self._write_pages
+
+
+    # Coloca las páginas "pages" en la tabla de lectura a partir de la dirección "addr".
+    # Lo usan los mappers cada vez que cambian de banco PRG
+    def set_read_pages(self, addr, pages):
+        first = addr >> 8
+        self._read_pages[first:first + len(pages)] = pages
+
+
+    ###############################################################################
+    # Funciones de las páginas con acceso a registros
+    ###############################################################################
+    def _read_ppu_reg(self, addr):
+        return self._ppu.read_reg(0x2000 + (addr & 0x07))
+
+
+    def _write_ppu_reg(self, data, addr):
+        self._ppu.write_reg(data, 0x2000 + (addr & 0x07))
+
+
+    def _read_io_reg(self, addr):
+        d = 0x00
+        if addr == 0x4016:      # Registro del Joypad 1
+            d = self._joypad_1.read_reg()
+        elif addr == 0x4017:        # Registro del Joypad 2
+            pass
+
+        return d
+
+
+    def _write_io_reg(self, data, addr):
+        if addr == 0x4014:      # Escritura de memoria de Sprites por DMA
+            self._ppu.write_sprite_dma(self, data)
+        elif addr == 0x4016:        # Joypad 1
+            self._joypad_1.write_reg(data)
+        elif addr == 0x4017:        # Joypad 2
+            pass
+
+
+    def _write_prg(self, data, addr):
+        self._mapper.write_prg(data, addr)
+        # Actualizamos el mirroring de las name tables por si ha cambiado. La cache de
+        # Tiles no hace falta resetearla porque se indexa por banco CHR
+        self._ppu.update_mirroring()
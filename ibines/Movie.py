@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+import struct
+import zlib
+
+
+"""
+Movie
+
+Descripción: Película de entrada: el estado del Joypad 1 de cada frame como
+máscara de botones (Joypad.BUTTON_*), un byte por frame. Se graba con
+NES.record_movie y se reproduce con NES.play_movie.
+Formato del fichero: cabecera "IBNM", versión, CRC32 de la ROM, número de
+frames y longitud del estado inicial; después el estado inicial (si no se grabó
+desde el encendido) y los bytes de entrada comprimidos con zlib
+"""
+class Movie(object):
+
+    MAGIC = "IBNM"
+    VERSION = 1
+    HEADER = "<4sBIII"
+
+    def __init__(self, rom_crc32, start_state=None, inputs=None):
+        self._rom_crc32 = rom_crc32
+        self._start_state = start_state
+        self._inputs = bytearray(inputs or [])
+
+
+    # Añade la máscara de botones de un frame
+    def append(self, buttons):
+        self._inputs.append(buttons & 0xFF)
+
+
+    # Devuelve las máscaras de botones de todos los frames
+    def get_inputs(self):
+        return self._inputs
+
+
+    def get_frame_count(self):
+        return len(self._inputs)
+
+
+    def get_rom_crc32(self):
+        return self._rom_crc32
+
+
+    # Devuelve el estado (NES.save_state) desde el que empieza la película, o None si
+    # empieza en el encendido
+    def get_start_state(self):
+        return self._start_state
+
+
+    # Guarda la película en el fichero "file_name"
+    def save(self, file_name):
+        state = self._start_state or ""
+        header = struct.pack(Movie.HEADER, Movie.MAGIC, Movie.VERSION, self._rom_crc32, len(self._inputs), len(state))
+
+        f = open(file_name, 'wb')
+        f.write(header + state + zlib.compress(str(self._inputs), 9))
+        f.close()
+
+
+    # Carga una película del fichero "file_name"
+    @staticmethod
+    def load(file_name):
+        f = open(file_name, 'rb')
+        data = f.read()
+        f.close()
+
+        magic, version, rom_crc32, frames, state_size = struct.unpack_from(Movie.HEADER, data)
+        if magic != Movie.MAGIC:
+            raise ValueError("El fichero no es una película de ibines")
+        if version != Movie.VERSION:
+            raise ValueError("Versión de película no soportada: " + str(version))
+
+        offset = struct.calcsize(Movie.HEADER)
+        start_state = data[offset:offset + state_size] or None
+        inputs = zlib.decompress(data[offset + state_size:])
+        if len(inputs) != frames:
+            raise ValueError("Película incompleta")
+
+        return Movie(rom_crc32, start_state, inputs)
+
+
+###############################################################################
+# Inicio del programa
+#
+# Uso:
+#   python Movie.py record rom película [frames]   -> juega con ventana y graba
+#   python Movie.py play rom película              -> reproduce sin ventana
+###############################################################################
+if __name__ == "__main__":
+    import sys
+    import time
+    import hashlib
+    from NES import NES
+
+    command, file_name, movie_file = sys.argv[1:4]
+
+    if command == "record":
+        frames = int(sys.argv[4]) if len(sys.argv) > 4 else None
+        nes = NES(file_name)
+        movie = nes.record_movie(frames)
+        movie.save(movie_file)
+        print "%d frames grabados en %s" % (movie.get_frame_count(), movie_file)
+    elif command == "play":
+        movie = Movie.load(movie_file)
+        nes = NES(file_name, headless=True, fast_cpu=True)
+
+        t = time.time()
+        nes.play_movie(movie)
+        t = time.time() - t
+
+        print "%d frames en %.2f s (%.1f fps)" % (movie.get_frame_count(), t, movie.get_frame_count() / t)
+        print "RAM md5: " + hashlib.md5(nes.get_ram()).hexdigest()
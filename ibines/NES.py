@@ -1,19 +1,19 @@
 # -*- coding: utf-8 -*-
 
 
+import struct
 import time
 import traceback
+import zlib
+import nesutils
 from ROM import ROM
 from ppu.PPU import *
 from cpu.CPU import *
+from cpu.FastCPU import FastCPU
 from Memory import Memory
 from Input import Joypad
-
-
-from mappers.NROM import NROM
-from mappers.CNROM import CNROM
-from mappers.MMC1 import MMC1
-from mappers.MMC3 import MMC3
+from Movie import Movie
+from mappers.MapperRegistry import create_mapper
 
 
 ###############################################################################
@@ -24,106 +24,252 @@ class NES(object):
 
     DEBUG = True
 
-    def __init__(self, file_name):
-        self._rom = ROM(file_name)
-
-        if self._rom.get_mapper_code() == 0:
-            self._mapper = NROM(self._rom)
-        elif self._rom.get_mapper_code() == 1:
-            self._mapper = MMC1(self._rom)
-        elif self._rom.get_mapper_code() == 3:
-            self._mapper = CNROM(self._rom)
-        elif self._rom.get_mapper_code() == 4:
-            self._mapper = MMC3(self._rom)
+    # Cabecera de los estados guardados: identificador, versión del formato y CRC32 de la ROM
+    STATE_MAGIC = "IBNS"
+    STATE_VERSION = 1
+    STATE_HEADER = "<4sBI"
+
+    # Campos del estado guardado con save_state
+    STATE_FIELDS = [("_total_cycles", "Q"), ("_key_counter", "I")]
+
+    # Mientras se mantiene pulsado el tabulador sólo se dibuja uno de cada tantos frames
+    FAST_FORWARD_FRAME_SKIP = 10
+
+    # Si "headless" es True se usa un motor gráfico en memoria sin ventana y no se
+    # consultan los eventos de SDL, por lo que no hace falta tener SDL instalado.
+    # Si "fast_cpu" es True se usa la CPU con tabla de opcodes precompilada en lugar
+    # de la implementación de referencia.
+    # Si se pasa "rom" se usa esa ROM ya cargada en lugar de leer el fichero "file_name".
+    # Sus bancos no se modifican nunca, así que se puede compartir entre varias instancias.
+    # Si "accurate_cycles" es True la CPU cuenta los ciclos exactos de cada instrucción
+    # (cruces de página y saltos tomados) y la latencia de las IRQ
+    def __init__(self, file_name, headless=False, fast_cpu=False, rom=None, accurate_cycles=False):
+        self._headless = headless
+        self._fast_cpu = fast_cpu
+        self._accurate_cycles = accurate_cycles
+
+        # Indica si se consultan los eventos de SDL durante la ejecución. Al grabar o
+        # reproducir una película la entrada sólo cambia al principio de cada frame
+        self._poll_input = not headless
+
+        if rom is None:
+            rom = ROM(file_name)
+        self._rom = rom
+
+        # Se comprueba antes de crear nada más: una ROM no válida o con un mapper no
+        # soportado falla aquí (ValueError o UnsupportedMapperError)
+        if not self._rom.get_load_ok():
+            raise ValueError("Formato de ROM incorrecto")
+
+        self._mapper = create_mapper(self._rom)
+
+        if headless:
+            gfx = GFX_Headless()
+        else:
+            gfx = GFX_PySdl2()
 
-        self._ppu = PPU(self._mapper)
+        self._ppu = PPU(self._mapper, gfx)
         self._joypad_1 = Joypad()
         self._memory = Memory(self._ppu, self._mapper, self._joypad_1)
-        self._cpu = CPU(self._memory, self._ppu)
+        if fast_cpu:
+            self._cpu = FastCPU(self._memory, self._ppu)
+        else:
+            self._cpu = CPU(self._memory, self._ppu)
+
+        if accurate_cycles:
+            self._cpu.set_accurate_cycles(True)
+
+        # Ciclos que tarda en atenderse una IRQ. En el modo normal no se cuentan
+        self._irq_latency = CPU.INT_LATENCY if accurate_cycles else 0
 
-        if self._mapper.MAPPER_CODE == 4:
-            self._mapper.set_cpu(self._cpu)
+        self._mapper.set_cpu(self._cpu)
 
         # Registros I/O del  JoyPad
         self._reg_joypad_1 = 0x00       # Dirección 0x4016 - read/write
         self._reg_joypad_2 = 0x00       # Dirección 0x4017 - read/write
 
+        # Ciclos totales de CPU desde que se inicia el emulador
+        self._total_cycles = 0
+
+        # Instrucciones de CPU ejecutadas desde que se inicia el emulador (estadística, no
+        # forma parte del estado guardado)
+        self._total_instructions = 0
+
+        # Contador de ciclos hasta la siguiente comprobación de una pulsación de tecla
+        self._key_counter = 0
+
+        # Frame skip a restaurar al soltar la tecla de avance rápido
+        self._normal_frame_skip = None
+
+    ###############################################################################
+    # Función: step()
+    # Descripción: Ejecuta una instrucción de la CPU (y la interrupción pendiente si
+    # la hay), sincroniza la PPU con los ciclos consumidos y devuelve dichos ciclos
+    ###############################################################################
+    def step(self):
+        cycles = 0                          # Ciclos de CPU de esta instrucción
+
+        # Si hay interrupciones y la CPU no está ocupada, las lanzamos
+        if self._ppu.get_int_vblank():
+            self._cpu.interrupt_vblank()        # Procesamos VBLANK
+            cycles += self._cpu.INT_LATENCY
+
+        if (not self._cpu.get_reg_p_i_bit()) & self._cpu.get_irq():
+            self._cpu.interrupt_irq()
+            cycles += self._irq_latency
+
+        # Fetch y Exec siguiente instrucción (si hemos ejecutado una
+        # interrupción en el paso anterior será su rutina de interrupción)
+        cycles += self._cpu.exec_inst()
+
+        # Restamos los ciclos de ejecución a la PPU
+        self._ppu.exec_cycle(cycles)
+
+        # Aquí se detectan las pulsaciones en los dispositivos de entrada. Por cuestiones de rendimiento, ya que
+        # es bastante caro comprobar en cada iteración del bucle, se hace solo cada 10000 ciclos de CPU
+        self._key_counter += cycles
+        if self._key_counter > 10000:
+            if self._poll_input:
+                self._poll_events()
+
+            self._key_counter = 0
+
+        self._total_cycles += cycles              # Incrementamos el contador de ciclos totales
+        self._total_instructions += 1
+
+        return cycles
+
+
+    ###############################################################################
+    # Función: step_event()
+    # Descripción: Ejecuta instrucciones de la CPU sin sincronizar la PPU hasta
+    # llegar al siguiente evento de la PPU (fin de scanline, en el que también se
+    # genera la IRQ del MMC3, inicio del VBLANK o fin del frame) y entonces
+    # sincroniza la PPU una sola vez con todos los ciclos. El estado de la PPU sólo
+    # cambia en estos eventos, así que el resultado es el mismo que ejecutando
+    # step() instrucción a instrucción. Devuelve los ciclos ejecutados
+    ###############################################################################
+    def step_event(self):
+        cpu = self._cpu
+        ppu = self._ppu
+        cycles = 0
+        instructions = 0
+
+        # La NMI sólo se activa en el inicio del VBLANK, que es un evento
+        if ppu.get_int_vblank():
+            cpu.interrupt_vblank()
+            cycles += cpu.INT_LATENCY
+
+        budget = ppu.get_cycles_to_event()
+
+        if cpu.get_irq():
+            # Con una IRQ pendiente hay que comprobar en cada instrucción si ya se
+            # puede atender (CLI, PLP, RTI) o si el programa la ha anulado
+            while True:
+                if (not cpu.get_reg_p_i_bit()) & cpu.get_irq():
+                    cpu.interrupt_irq()
+                    cycles += self._irq_latency
+
+                cycles += cpu.exec_inst()
+                instructions += 1
+                if cycles >= budget:
+                    break
+        else:
+            # Las IRQ sólo se generan en los eventos, así que hasta el siguiente no
+            # hay nada que comprobar entre instrucciones
+            exec_inst = cpu.exec_inst
+            while True:
+                cycles += exec_inst()
+                instructions += 1
+                if cycles >= budget:
+                    break
+
+        ppu.exec_cycle(cycles)
+
+        self._key_counter += cycles
+        if self._key_counter > 10000:
+            if self._poll_input:
+                self._poll_events()
+
+            self._key_counter = 0
+
+        self._total_cycles += cycles
+        self._total_instructions += instructions
+
+        return cycles
+
+
+    ###############################################################################
+    # Función: reset()
+    # Descripción: Pulsa el botón de reset de la consola. Se reinicia la CPU y se
+    # borran los registros de control de la PPU; la memoria y el mapper conservan su
+    # estado, como en la consola real
+    ###############################################################################
+    def reset(self):
+        self._cpu.reset()
+        self._ppu.write_reg(0x00, 0x2000)
+        self._ppu.write_reg(0x00, 0x2001)
+        self._ppu.set_int_vblank(0)
+
+
+    ###############################################################################
+    # Función: run_cycles(n)
+    # Parámetros:
+    #   n -> número de ciclos de CPU a ejecutar
+    # Descripción: Ejecuta instrucciones hasta consumir al menos 'n' ciclos de CPU y
+    # devuelve el número de ciclos ejecutados realmente (la última instrucción puede
+    # pasarse de 'n')
+    ###############################################################################
+    def run_cycles(self, n):
+        cycles = 0
+        while cycles < n:
+            cycles += self.step()
+
+        return cycles
+
+
+    ###############################################################################
+    # Función: step_frame()
+    # Descripción: Ejecuta instrucciones hasta que la PPU finaliza el frame actual y
+    # devuelve el número de ciclos de CPU ejecutados
+    ###############################################################################
+    def step_frame(self):
+        cycles = 0
+        frame = self._ppu.get_frame_count()
+        while self._ppu.get_frame_count() == frame:
+            cycles += self.step_event()
+
+        return cycles
+
+
+    ###############################################################################
+    # Función: run_frames(n)
+    # Parámetros:
+    #   n -> número de frames a ejecutar
+    # Descripción: Ejecuta 'n' frames completos y devuelve el control. Devuelve el
+    # número de ciclos de CPU ejecutados
+    ###############################################################################
+    def run_frames(self, n):
+        cycles = 0
+        for i in xrange(n):
+            cycles += self.step_frame()
+
+        return cycles
+
+
     ###############################################################################
     # Función: run()
     # Descripción: Aquí se implementa el bucle principal de la NES. Cada iteración
-    # ejecuta una instrucción llevando la cuenta de los ciclos de CPU consumidos
-    # para sincronizarse con la PPU
+    # ejecuta las instrucciones hasta el siguiente evento de la PPU llevando la
+    # cuenta de los ciclos de CPU consumidos para sincronizarse con ella
     ###############################################################################
     def run(self):
         stats_cycles = 0                    # Ciclos de CPU ejecutados para fines estadisticos
         stats_total_time = time.time()      # Tiempo de ejecución transcurrido para fines estadísticos
-        total_cycles = 0                    # Ciclos totales de CPU desde que se inicia el emulador
-        key_counter = 0                     # Contador de ciclos hasta la siguiente comprobación de una pulsación de tecla
-        cycles = 0                          # Ciclos de CPU de una iteración del bucle
 
         # Bucle principal
         while 1:
-            # Si hay interrupciones y la CPU no está ocupada, las lanzamos
-            if self._ppu.get_int_vblank():
-                self._cpu.interrupt_vblank()        # Procesamos VBLANK
-                cycles += self._cpu.INT_LATENCY
-
-            if (not self._cpu.get_reg_p_i_bit()) & self._cpu.get_irq():
-                self._cpu.interrupt_irq()
-
-            # Fetch y Exec siguiente instrucción (si hemos ejecutado una
-            # interrupción en el paso anterior será su rutina de interrupción)
-            inst = self._cpu.fetch_inst()
-            cycles += inst.execute()
-
-            # Restamos los ciclos de ejecución a la PPU
-            self._ppu.exec_cycle(cycles)
-
-            # Aquí se detectan las pulsaciones en los dispositivos de entrada. Por cuestiones de rendimiento, ya que
-            # es bastante caro comprobar en cada iteración del bucle, se hace solo cada 10000 ciclos de CPU
-            key_counter += cycles
-            if key_counter > 10000:
-                # Eventos SDL (entrada por ejemplo)
-                sdl_events = sdl2.ext.get_events()
-                for e in sdl_events:
-                    if e.type == sdl2.SDL_KEYDOWN:
-                        if e.key.keysym.sym == sdl2.SDLK_w:
-                            self._joypad_1.set_up(1)
-                        elif e.key.keysym.sym == sdl2.SDLK_s:
-                            self._joypad_1.set_down(1)
-                        elif e.key.keysym.sym == sdl2.SDLK_a:
-                            self._joypad_1.set_left(1)
-                        elif e.key.keysym.sym == sdl2.SDLK_d:
-                            self._joypad_1.set_right(1)
-                        elif e.key.keysym.sym == sdl2.SDLK_o:
-                            self._joypad_1.set_b(1)
-                        elif e.key.keysym.sym == sdl2.SDLK_p:
-                            self._joypad_1.set_a(1)
-                        elif e.key.keysym.sym == sdl2.SDLK_RETURN:
-                            self._joypad_1.set_start(1)
-                        elif e.key.keysym.sym == sdl2.SDLK_RSHIFT:
-                            self._joypad_1.set_select(1)
-                    elif e.type == sdl2.SDL_KEYUP:
-                        if e.key.keysym.sym == sdl2.SDLK_w:
-                            self._joypad_1.set_up(0)
-                        elif e.key.keysym.sym == sdl2.SDLK_s:
-                            self._joypad_1.set_down(0)
-                        elif e.key.keysym.sym == sdl2.SDLK_a:
-                            self._joypad_1.set_left(0)
-                        elif e.key.keysym.sym == sdl2.SDLK_d:
-                            self._joypad_1.set_right(0)
-                        elif e.key.keysym.sym == sdl2.SDLK_o:
-                            self._joypad_1.set_b(0)
-                        elif e.key.keysym.sym == sdl2.SDLK_p:
-                            self._joypad_1.set_a(0)
-                        elif e.key.keysym.sym == sdl2.SDLK_RETURN:
-                            self._joypad_1.set_start(0)
-                        elif e.key.keysym.sym == sdl2.SDLK_RSHIFT:
-                            self._joypad_1.set_select(0)
-
-                key_counter = 0
-
-            total_cycles += cycles              # Incrementamos el contador de ciclos totales
+            cycles = self.step_event()
 
             # Estadísticas
             stats_cycles += cycles
@@ -141,8 +287,241 @@ class NES(object):
             # Emula la velocidad de la NES
             #time.sleep(0.0000006)
 
-            cycles = 0
-            
+
+    # Devuelve los ciclos totales de CPU ejecutados desde que se inició el emulador
+    def get_total_cycles(self):
+        return self._total_cycles
+
+
+    # Devuelve las instrucciones de CPU ejecutadas desde que se inició el emulador
+    def get_total_instructions(self):
+        return self._total_instructions
+
+
+    # Devuelve el número de frames completados por la PPU
+    def get_frame_count(self):
+        return self._ppu.get_frame_count()
+
+
+    # Dibuja sólo uno de cada "n" frames (con 1 se dibujan todos). Los frames que no se
+    # dibujan se emulan igual, pero más rápido, y la imagen actual sigue siendo
+    # la del último frame dibujado
+    def set_frame_skip(self, n):
+        self._ppu.set_frame_skip(n)
+
+
+    def get_frame_skip(self):
+        return self._ppu.get_frame_skip()
+
+
+    # Devuelve la vista de NumPy de 240x256 colores ARGB de la imagen actual
+    def get_frame(self):
+        return self._ppu.get_gfx().get_frame()
+
+
+    # Devuelve una copia de los 2KB de memoria RAM
+    def get_ram(self):
+        return self._memory.get_ram()
+
+
+    # Devuelve el Joypad 1
+    def get_joypad_1(self):
+        return self._joypad_1
+
+
+    ###############################################################################
+    # Función: save_state()
+    # Descripción: Devuelve el estado completo del sistema como una cadena binaria
+    # versionada. Sólo se guarda la memoria física (sin espejos ni bancos de la ROM)
+    # y los registros, comprimidos con zlib. La imagen del motor gráfico no forma
+    # parte del estado: tras restaurar en mitad de un frame, ese frame sólo tiene
+    # dibujados los scanlines posteriores
+    ###############################################################################
+    def save_state(self):
+        header = struct.pack(NES.STATE_HEADER, NES.STATE_MAGIC, NES.STATE_VERSION, self._rom.get_crc32())
+
+        return header + zlib.compress(nesutils.pack_sections(self._get_state_sections()), 1)
+
+
+    ###############################################################################
+    # Función: load_state(state)
+    # Parámetros:
+    #   state -> estado devuelto por save_state
+    # Descripción: Restaura el estado guardado con save_state. El estado tiene que
+    # ser de la misma versión del formato y de la misma ROM
+    ###############################################################################
+    def load_state(self, state):
+        size = struct.calcsize(NES.STATE_HEADER)
+        magic, version, crc32 = struct.unpack_from(NES.STATE_HEADER, state)
+
+        if magic != NES.STATE_MAGIC:
+            raise ValueError("El estado no es un estado guardado de ibines")
+        if version != NES.STATE_VERSION:
+            raise ValueError("Versión de estado no soportada: " + str(version))
+        if crc32 != self._rom.get_crc32():
+            raise ValueError("El estado es de otra ROM")
+
+        self._set_state_sections(nesutils.unpack_sections(zlib.decompress(state[size:])))
+
+
+    ###############################################################################
+    # Función: fork(n, headless)
+    # Parámetros:
+    #   n -> número de copias a crear
+    #   headless -> si las copias usan el motor gráfico sin ventana
+    # Descripción: Devuelve una lista de 'n' copias independientes del sistema en su
+    # estado actual. Las copias comparten la ROM ya cargada, cuyos bancos PRG y CHR
+    # son de sólo lectura, y los tiles ya decodificados de la CHR-ROM. Sólo copian la
+    # memoria física, los registros y la imagen actual
+    ###############################################################################
+    def fork(self, n, headless=True):
+        sections = self._get_state_sections()
+        frame = self._ppu.get_gfx().get_frame()
+
+        children = []
+        for i in xrange(n):
+            child = NES(None, headless, self._fast_cpu, rom=self._rom, accurate_cycles=self._accurate_cycles)
+            child._ppu.share_tiles_cache(self._ppu)
+            child.set_frame_skip(self.get_frame_skip())
+            child._set_state_sections(sections)
+            child._ppu.get_gfx().draw_frame(frame)
+            children.append(child)
+
+        return children
+
+
+    ###############################################################################
+    # Función: record_movie(frames)
+    # Parámetros:
+    #   frames -> número de frames a grabar. Si es None se graba hasta Ctrl+C
+    # Descripción: Ejecuta el sistema como run() guardando el estado del Joypad 1 de
+    # cada frame y devuelve la película grabada. Los eventos de SDL sólo se leen al
+    # principio de cada frame, de forma que la entrada es la misma durante todo el
+    # frame y la reproducción es exacta. Si no se graba desde el encendido, la
+    # película incluye el estado inicial
+    ###############################################################################
+    def record_movie(self, frames=None):
+        start_state = self.save_state() if self._total_cycles else None
+        movie = Movie(self._rom.get_crc32(), start_state)
+
+        poll_input = self._poll_input
+        self._poll_input = False
+        try:
+            while frames is None or movie.get_frame_count() < frames:
+                if not self._headless:
+                    self._poll_events()
+
+                movie.append(self._joypad_1.get_buttons())
+                self.step_frame()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._poll_input = poll_input
+
+        return movie
+
+
+    ###############################################################################
+    # Función: play_movie(movie)
+    # Parámetros:
+    #   movie -> película grabada con record_movie
+    # Descripción: Reproduce la película frame a frame sin consultar los eventos de
+    # SDL. Si la película tiene estado inicial se carga antes. Devuelve el número de
+    # ciclos de CPU ejecutados
+    ###############################################################################
+    def play_movie(self, movie):
+        if movie.get_rom_crc32() != self._rom.get_crc32():
+            raise ValueError("La película es de otra ROM")
+
+        if movie.get_start_state() is not None:
+            self.load_state(movie.get_start_state())
+
+        cycles = 0
+        poll_input = self._poll_input
+        self._poll_input = False
+        try:
+            for buttons in movie.get_inputs():
+                self._joypad_1.set_buttons(buttons)
+                cycles += self.step_frame()
+        finally:
+            self._poll_input = poll_input
+
+        return cycles
+
+
+    # Devuelve la lista de secciones binarias del estado de cada componente
+    def _get_state_sections(self):
+        return [nesutils.pack_fields(self, NES.STATE_FIELDS),
+                self._cpu.get_state(),
+                self._memory.get_state(),
+                self._joypad_1.get_state(),
+                self._mapper.get_state(),
+                self._ppu.get_state()]
+
+
+    # Restaura el estado de cada componente a partir de las secciones de _get_state_sections
+    def _set_state_sections(self, sections):
+        nes, cpu, memory, joypad, mapper, ppu = sections
+
+        # El mapper primero, ya que la memoria de la PPU depende de su mirroring y los
+        # sprites de sus bancos CHR
+        self._mapper.set_state(mapper)
+        self._memory.set_state(memory)
+        self._ppu.set_state(ppu)
+        self._joypad_1.set_state(joypad)
+        self._cpu.set_state(cpu)
+        nesutils.unpack_fields(self, NES.STATE_FIELDS, nes)
+
+
+    ###############################################################################
+    # Función: _poll_events()
+    # Descripción: Procesa los eventos de SDL y actualiza el estado del Joypad
+    ###############################################################################
+    def _poll_events(self):
+        # Eventos SDL (entrada por ejemplo)
+        sdl_events = sdl2.ext.get_events()
+        for e in sdl_events:
+            if e.type == sdl2.SDL_KEYDOWN:
+                if e.key.keysym.sym == sdl2.SDLK_w:
+                    self._joypad_1.set_up(1)
+                elif e.key.keysym.sym == sdl2.SDLK_s:
+                    self._joypad_1.set_down(1)
+                elif e.key.keysym.sym == sdl2.SDLK_a:
+                    self._joypad_1.set_left(1)
+                elif e.key.keysym.sym == sdl2.SDLK_d:
+                    self._joypad_1.set_right(1)
+                elif e.key.keysym.sym == sdl2.SDLK_o:
+                    self._joypad_1.set_b(1)
+                elif e.key.keysym.sym == sdl2.SDLK_p:
+                    self._joypad_1.set_a(1)
+                elif e.key.keysym.sym == sdl2.SDLK_RETURN:
+                    self._joypad_1.set_start(1)
+                elif e.key.keysym.sym == sdl2.SDLK_RSHIFT:
+                    self._joypad_1.set_select(1)
+                elif e.key.keysym.sym == sdl2.SDLK_TAB and self._normal_frame_skip is None:
+                    self._normal_frame_skip = self.get_frame_skip()
+                    self.set_frame_skip(NES.FAST_FORWARD_FRAME_SKIP)
+            elif e.type == sdl2.SDL_KEYUP:
+                if e.key.keysym.sym == sdl2.SDLK_w:
+                    self._joypad_1.set_up(0)
+                elif e.key.keysym.sym == sdl2.SDLK_s:
+                    self._joypad_1.set_down(0)
+                elif e.key.keysym.sym == sdl2.SDLK_a:
+                    self._joypad_1.set_left(0)
+                elif e.key.keysym.sym == sdl2.SDLK_d:
+                    self._joypad_1.set_right(0)
+                elif e.key.keysym.sym == sdl2.SDLK_o:
+                    self._joypad_1.set_b(0)
+                elif e.key.keysym.sym == sdl2.SDLK_p:
+                    self._joypad_1.set_a(0)
+                elif e.key.keysym.sym == sdl2.SDLK_RETURN:
+                    self._joypad_1.set_start(0)
+                elif e.key.keysym.sym == sdl2.SDLK_RSHIFT:
+                    self._joypad_1.set_select(0)
+                elif e.key.keysym.sym == sdl2.SDLK_TAB and self._normal_frame_skip is not None:
+                    self.set_frame_skip(self._normal_frame_skip)
+                    self._normal_frame_skip = None
+
 
     def _log_inst(self, inst):
         s = str(hex(self._cpu._reg_pc))
@@ -171,17 +550,24 @@ class NES(object):
 ###############################################################################
 # Inicio del programa
 ###############################################################################
+if __name__ == "__main__":
+    import sys
+
+    #file_name = "../roms/Super Mario Bros. (E).nes"
+    #file_name = "../roms/Donkey Kong Classics (USA, Europe).nes"
+    file_name = "../roms/Super Mario Bros 3 (E).nes"
+    #file_name = "../tests/nestest.nes"
+    #file_name = "../tests/instr_test-v4/rom_singles/10-branches.nes"
+    #file_name = "../tests/instr_test-v4/official_only.nes"
+    #file_name = "../tests/instr_test-v4/all_instrs.nes"
+
+    # Se puede indicar la ROM como parámetro
+    if len(sys.argv) > 1:
+        file_name = sys.argv[1]
 
-#file_name = "../roms/Super Mario Bros. (E).nes"
-#file_name = "../roms/Donkey Kong Classics (USA, Europe).nes"
-file_name = "../roms/Super Mario Bros 3 (E).nes"
-#file_name = "../tests/nestest.nes"
-#file_name = "../tests/instr_test-v4/rom_singles/10-branches.nes"
-#file_name = "../tests/instr_test-v4/official_only.nes"
-#file_name = "../tests/instr_test-v4/all_instrs.nes"
-nes = NES(file_name)
+    nes = NES(file_name)
 
-nes.run()               # Ejecutamos
+    nes.run()               # Ejecutamos
 
-# Código de profiling
-#cProfile.run("nes.run()", "profiling.log")
+    # Código de profiling
+    #cProfile.run("nes.run()", "profiling.log")
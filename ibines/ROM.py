@@ -1,16 +1,60 @@
 # -*- coding: utf-8 -*-
 
+import mmap
+import zipfile
+import zlib
+
+
+"""
+MappedBuffer
+
+Descripción: Bytes de un fichero proyectado en memoria con mmap que se leen como
+enteros, igual que un bytearray, sin copiarlos a la memoria del proceso. Las
+páginas del fichero están en la caché de páginas del sistema operativo, que
+comparten todos los procesos que proyectan el mismo fichero
+"""
+class MappedBuffer(object):
+
+    def __init__(self, data):
+        self._data = data
+
+
+    def __len__(self):
+        return len(self._data)
+
+
+    # En Python 2 mmap devuelve cada byte como una cadena de un carácter
+    def __getitem__(self, addr):
+        return ord(self._data[addr])
+
+
+    # Devuelve una copia de los bytes "start" a "end" en un bytearray
+    def copy(self, start, end):
+        return bytearray(self._data[start:end])
+
+
 # Clase que implementa la estructura de la ROM de un juego
 # TODO: empollarse e implementar los mappers
 class ROM(object):
     PGR_SIZE = 16384
     CHR_SIZE = 8192
 
-    def __init__(self, file_name):
+    # Tamaño de los trozos en los que se calcula el CRC32 de una ROM proyectada en memoria
+    CRC_CHUNK_SIZE = 0x10000
+
+    # Si "use_mmap" es True el fichero se proyecta en memoria de sólo lectura en lugar de
+    # leerlo entero: los bancos CHR se leen del fichero proyectado y de la memoria PRG
+    # sólo se copian las páginas que llegan a colocarse en la tabla de páginas de la CPU.
+    # Si "file_name" es un .zip se lee sin extraerlo a disco el fichero "member" o, si no
+    # se indica, el primer .nes que contenga. Los .zip no se pueden proyectar en memoria
+    def __init__(self, file_name, use_mmap=False, member=None):
         ###########################################################################
         # Variables de instancia
         ###########################################################################
-        self._rom = None            # Los bytes de la ROM en forma de lista
+        self._use_mmap = use_mmap and not ROM.is_zip(file_name)
+
+        self._rom = None            # Los bytes de la ROM (bytearray o MappedBuffer)
+        self._crc32 = 0             # CRC32 del fichero, identifica el juego en los estados guardados
 
         self._prg_count = 0
         self._chr_count = 0
@@ -19,32 +63,48 @@ class ROM(object):
         self._ram_count = 0
         self._reserved = [0x00] * 7
 
+        # Posición en el buffer de la ROM en la que empiezan la memoria PRG y la CHR. Los
+        # bancos no se copian: los mappers leen directamente del buffer
+        self._prg_start = 0
+        self._chr_start = 0
+
+        # Memoria PRG troceada en páginas de 256 bytes para la tabla de páginas de la CPU.
+        # Cada página se copia del buffer la primera vez que se coloca (None hasta entonces)
+        self._prg_pages = []
+
         # Guarda si la ROM ha cargado correctamente
         self._load_ok = False
         ###########################################################################
         ###########################################################################
 
-        self.load_file(file_name)
+        self.load_file(file_name, member)
 
 
-    def load_file(self, file_name):
-        f = open(file_name, 'r')
-        self._rom = bytearray(f.read())
-        f.close()
+    # Indica si "file_name" es un fichero .zip
+    @staticmethod
+    def is_zip(file_name):
+        return file_name.lower().endswith(".zip")
+
+
+    def load_file(self, file_name, member=None):
+        if ROM.is_zip(file_name):
+            self._rom = bytearray(ROM._read_zip(file_name, member))
+            self._crc32 = zlib.crc32(str(self._rom)) & 0xFFFFFFFF
+        else:
+            self._read_file(file_name)
+
+        header = self._copy(0, 16)
 
         # Comprueba que el formato de la cabecera sea correcto
-        if (str(self._rom[0:3]) == "NES") and self._rom[3] == 0x1A:
+        if (str(header[0:3]) == "NES") and header[3] == 0x1A:
             # Carga la cabecera
-            self._prg_count = self._rom[4]
-            self._chr_count = self._rom[5]
-            self._rom_control_1 = self._rom[6]
-            self._rom_control_2 = self._rom[7]
-            self._ram_count = self._rom[8]
-            self._reserved = self._rom[9:16]
-
-            # Reserva la memoria para almacenar los bancos en función del número de estos
-            self._prg_banks = [None] * self._prg_count
-            self._chr_banks = [None] * self._chr_count
+            self._prg_count = header[4]
+            self._chr_count = header[5]
+            self._rom_control_1 = header[6]
+            self._rom_control_2 = header[7]
+            self._ram_count = header[8]
+            self._reserved = header[9:16]
+
             self._ram_banks = [None] * self._ram_count
 
             # Mirroring
@@ -58,18 +118,18 @@ class ROM(object):
 
             # Si hay un trainer lo carga primero
             if self.get_control_1_trainer_bit_2():
-                self._trainer = self._rom[i:i + 512]
+                self._trainer = self._copy(i, i + 512)
                 i += 512
 
-            # Carga los bancos PRG
-            for n in range(self._prg_count):
-                self._prg_banks[n] = self._rom[i:i + 16384]
-                i += 16384
+            # Bancos PRG
+            self._prg_start = i
+            i += self._prg_count * ROM.PGR_SIZE
+
+            # Las páginas de la memoria PRG se copian al colocarlas por primera vez
+            self._prg_pages = [None] * (self._prg_count * (ROM.PGR_SIZE >> 8))
 
-            # Carga los bancos CHR
-            for n in range(self._chr_count):
-                self._chr_banks[n] = self._rom[i:i + 8192]
-                i += 8192
+            # Bancos CHR
+            self._chr_start = i
 
             self._load_ok = True
         else:
@@ -77,11 +137,59 @@ class ROM(object):
             print "Formato de fichero incorrecto"
 
 
+    # Lee el fichero "file_name" (o lo proyecta en memoria) y calcula su CRC32
+    def _read_file(self, file_name):
+        f = open(file_name, 'rb')
+        if self._use_mmap:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._rom = MappedBuffer(data)
+
+            # El CRC32 se calcula por trozos para no copiar el fichero entero
+            crc32 = 0
+            for a in xrange(0, len(data), ROM.CRC_CHUNK_SIZE):
+                crc32 = zlib.crc32(data[a:a + ROM.CRC_CHUNK_SIZE], crc32)
+            self._crc32 = crc32 & 0xFFFFFFFF
+        else:
+            self._rom = bytearray(f.read())
+            self._crc32 = zlib.crc32(str(self._rom)) & 0xFFFFFFFF
+        f.close()
+
+
+    # Devuelve el contenido del fichero "member" del .zip "file_name", o del primer .nes
+    # si "member" es None
+    @staticmethod
+    def _read_zip(file_name, member=None):
+        archive = zipfile.ZipFile(file_name)
+        try:
+            if member is None:
+                members = [name for name in archive.namelist() if name.lower().endswith(".nes")]
+                if not members:
+                    raise IOError("El fichero %s no contiene ninguna ROM .nes" % file_name)
+                member = members[0]
+
+            return archive.read(member)
+        finally:
+            archive.close()
+
+
+    # Devuelve una copia de los bytes "start" a "end" del fichero en un bytearray
+    def _copy(self, start, end):
+        if self._use_mmap:
+            return self._rom.copy(start, end)
+        else:
+            return self._rom[start:end]
+
+
     # Devuelve si la ROM ha cargado correctamente
     def get_load_ok(self):
         return self._load_ok
 
 
+    # Devuelve el CRC32 del fichero de la ROM
+    def get_crc32(self):
+        return self._crc32
+
+
     # Devuelve el modo mirroring especificado en la ROM:
     # 0x00: horizontal
     # 0x01: vertical
@@ -121,50 +229,36 @@ class ROM(object):
         return self._chr_count
 
 
-    # Devuelve el banco PGR especificado por n
-    def get_prg(self, n):
-        return self._prg_banks[n]
-
-
-    # Devuelve un banco PRG con direccionamiento como si fuesen de 8k en vez de 16k
-    def get_prg_8k(self, n):
-        number = n >> 1
-        part = n & 0x01
-
-        if part == 0:
-            bank = self._prg_banks[number][0:8192]
-        else:
-            bank = self._prg_banks[number][8192:16384]
-
-        return bank
-
-
-    # Devuelve el banco CHR especificado por n
-    def get_chr(self, n):
-        return self._chr_banks[n]
-
-
-    def get_chr_4h(self, n):
-        bank_number = n / 2
-
-        # Si es par es la primera mitad del banco de 8k
-        if n & 0x01 == 0:
-            return self._chr_banks[bank_number][0x0000:0x1000]
-        else:
-            return self._chr_banks[bank_number][0x1000:0x2000]
-
+    # Devuelve el buffer con todos los bytes de la ROM (un MappedBuffer si se ha proyectado
+    # en memoria). No se modifica nunca, así que los mappers (y las instancias que
+    # comparten la ROM) leen sus bancos directamente de él
+    def get_data(self):
+        return self._rom
 
-    # Devuelve un banco CHR con direccionamiento como si fuesen de 1k en vez de 8k
-    def get_chr_1k(self, n):
-        number = n >> 3
-        part = n & 0x07
-        addr = part * 1024
 
-        bank = self._chr_banks[number][addr:addr + 1024]
+    # Devuelve la posición en el buffer de la ROM del byte "offset" de la memoria PRG. Si
+    # "offset" se sale de la ROM vuelve al principio
+    def get_prg_address(self, offset):
+        return self._prg_start + offset % (self._prg_count * ROM.PGR_SIZE)
 
-        return bank
 
+    # Devuelve la lista de páginas de 256 bytes que ocupan "size" bytes de la memoria PRG
+    # a partir de la posición "offset". Si "offset" se sale de la ROM vuelve al principio
+    def get_prg_pages(self, offset, size):
+        first = (offset % (self._prg_count * ROM.PGR_SIZE)) >> 8
+        last = first + (size >> 8)
 
+        pages = self._prg_pages[first:last]
+        if None in pages:
+            for n in xrange(first, last):
+                if self._prg_pages[n] is None:
+                    addr = self._prg_start + (n << 8)
+                    self._prg_pages[n] = self._copy(addr, addr + 256)
+            pages = self._prg_pages[first:last]
 
+        return pages
 
 
+    # Devuelve la posición en el buffer de la ROM del byte "offset" de la memoria CHR
+    def get_chr_address(self, offset):
+        return self._chr_start + offset
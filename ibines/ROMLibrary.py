@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import zipfile
+from ROM import ROM
+
+
+"""
+ROMLibrary
+
+Descripción: Colección de ROMs de un directorio (y sus subdirectorios): ficheros
+.nes y ficheros .nes dentro de .zip, que se leen sin extraerlos a disco. Guarda
+en un índice persistente en JSON los datos de la cabecera iNES de cada ROM
+(mapper, bancos PRG y CHR, mirroring) y su CRC32, de forma que se puede filtrar
+la colección sin volver a leer las ROMs. Al volver a escanear sólo se leen los
+ficheros nuevos o cuyo tamaño o fecha de modificación han cambiado.
+Cada ROM se identifica por su clave: la ruta relativa al directorio y, si está
+dentro de un .zip, el nombre del fichero dentro de él separado por ":"
+"""
+class ROMLibrary(object):
+
+    # Nombre por defecto del fichero del índice, dentro del directorio de la colección
+    INDEX_FILE = ".ibines_index.json"
+    INDEX_VERSION = 1
+
+    # Separador entre la ruta del .zip y el fichero dentro de él en las claves
+    MEMBER_SEPARATOR = ":"
+
+    # Si no se indica "index_file" el índice se guarda en el propio directorio
+    def __init__(self, directory, index_file=None):
+        #######################################################################
+        # Variables de instancia
+        #######################################################################
+        self._directory = directory
+        self._index_file = index_file or os.path.join(directory, ROMLibrary.INDEX_FILE)
+
+        # Entradas del índice por clave
+        self._entries = {}
+        #######################################################################
+        #######################################################################
+
+        self._load_index()
+
+
+    ###############################################################################
+    # Función: scan()
+    # Descripción: Recorre el directorio y actualiza el índice con las ROMs nuevas o
+    # modificadas, quita las que ya no existen y guarda el índice si ha cambiado.
+    # Devuelve el número de ROMs que se han tenido que leer
+    ###############################################################################
+    def scan(self):
+        entries = {}
+        read = 0
+
+        # Entradas actuales agrupadas por fichero
+        files = {}
+        for entry in self._entries.itervalues():
+            files.setdefault(entry["file"], []).append(entry)
+
+        for path in self._find_files():
+            stat = os.stat(os.path.join(self._directory, path))
+            old = files.get(path)
+
+            # Si el fichero no ha cambiado se conservan sus entradas
+            if old and all(e["size"] == stat.st_size and e["mtime"] == stat.st_mtime for e in old):
+                for entry in old:
+                    entries[entry["key"]] = entry
+                continue
+
+            members = self._get_members(path) if ROM.is_zip(path) else [None]
+            for member in members:
+                entry = self._read_entry(path, member)
+                entry["size"] = stat.st_size
+                entry["mtime"] = stat.st_mtime
+                entries[entry["key"]] = entry
+                read += 1
+
+        changed = read > 0 or len(entries) != len(self._entries)
+        self._entries = entries
+        if changed:
+            self._save_index()
+
+        return read
+
+
+    # Devuelve las entradas del índice ordenadas por clave. Cada una es un diccionario
+    # con "key", "file", "member", "size", "mtime", "valid" y, si la cabecera es
+    # válida, "mapper", "prg_count", "chr_count", "mirroring" y "crc32"
+    def get_entries(self):
+        return [self._entries[key] for key in sorted(self._entries)]
+
+
+    ###############################################################################
+    # Función: find(**fields)
+    # Parámetros:
+    #   fields -> valores que deben tener los campos de la entrada, p. ej. mapper=4.
+    #             Si el valor es una lista o una tupla basta con que sea uno de ellos
+    # Descripción: Devuelve las entradas con ROM válida que cumplen todas las condiciones
+    ###############################################################################
+    def find(self, **fields):
+        found = []
+        for entry in self.get_entries():
+            if not entry["valid"]:
+                continue
+
+            for name, value in fields.iteritems():
+                if isinstance(value, (list, tuple)):
+                    if entry.get(name) not in value:
+                        break
+                elif entry.get(name) != value:
+                    break
+            else:
+                found.append(entry)
+
+        return found
+
+
+    # Devuelve la entrada de la ROM con la clave "key"
+    def get_entry(self, key):
+        return self._entries[key]
+
+
+    # Carga la ROM con la clave "key". Las ROMs que no están dentro de un .zip se pueden
+    # proyectar en memoria con "use_mmap"
+    def load(self, key, use_mmap=False):
+        entry = self._entries[key]
+        return ROM(os.path.join(self._directory, entry["file"]), use_mmap, entry["member"])
+
+
+    # Devuelve las rutas relativas de los ficheros .nes y .zip del directorio
+    def _find_files(self):
+        files = []
+        for root, dirs, names in os.walk(self._directory):
+            dirs.sort()
+            for name in sorted(names):
+                if name.lower().endswith((".nes", ".zip")):
+                    files.append(os.path.relpath(os.path.join(root, name), self._directory))
+
+        return files
+
+
+    # Devuelve los nombres de los ficheros .nes del .zip "path"
+    def _get_members(self, path):
+        try:
+            archive = zipfile.ZipFile(os.path.join(self._directory, path))
+        except zipfile.BadZipfile:
+            return []
+
+        try:
+            return [name for name in archive.namelist() if name.lower().endswith(".nes")]
+        finally:
+            archive.close()
+
+
+    # Lee la ROM y devuelve su entrada del índice
+    def _read_entry(self, path, member):
+        key = path if member is None else path + ROMLibrary.MEMBER_SEPARATOR + member
+        entry = {"key": key, "file": path, "member": member, "valid": False}
+
+        try:
+            rom = ROM(os.path.join(self._directory, path), member=member)
+        except (IOError, zipfile.BadZipfile, KeyError):
+            return entry
+
+        if rom.get_load_ok():
+            entry["valid"] = True
+            entry["mapper"] = rom.get_mapper_code()
+            entry["prg_count"] = rom.get_prg_count()
+            entry["chr_count"] = rom.get_chr_count()
+            entry["mirroring"] = rom.get_mirroring()
+            entry["crc32"] = rom.get_crc32()
+
+        return entry
+
+
+    # Carga el índice guardado. Si no existe, o es de otra versión, se empieza vacío
+    def _load_index(self):
+        try:
+            f = open(self._index_file, 'r')
+            index = json.load(f)
+            f.close()
+        except (IOError, ValueError):
+            return
+
+        if index.get("version") == ROMLibrary.INDEX_VERSION:
+            self._entries = dict((entry["key"], entry) for entry in index["entries"])
+
+
+    # Guarda el índice. Se escribe en un fichero temporal que luego se renombra para
+    # que otros procesos nunca lean un índice a medias
+    def _save_index(self):
+        tmp_file = self._index_file + ".tmp"
+        f = open(tmp_file, 'w')
+        json.dump({"version": ROMLibrary.INDEX_VERSION, "entries": self.get_entries()}, f, indent=1, sort_keys=True)
+        f.close()
+        os.rename(tmp_file, self._index_file)
+
+
+###############################################################################
+# Inicio del programa
+#
+# Uso:
+#   python ROMLibrary.py directorio [mapper]   -> escanea y lista las ROMs
+###############################################################################
+if __name__ == "__main__":
+    import sys
+    import time
+
+    library = ROMLibrary(sys.argv[1])
+
+    t = time.time()
+    read = library.scan()
+    t = time.time() - t
+
+    if len(sys.argv) > 2:
+        entries = library.find(mapper=int(sys.argv[2]))
+    else:
+        entries = library.get_entries()
+
+    for entry in entries:
+        if entry["valid"]:
+            print "%-60s mapper %3d  PRG %3d  CHR %3d  mirroring %d  CRC32 %08X" % (
+                entry["key"], entry["mapper"], entry["prg_count"], entry["chr_count"], entry["mirroring"], entry["crc32"])
+        else:
+            print "%-60s cabecera no válida" % entry["key"]
+
+    print "%d ROMs (%d leídas) en %.3f s" % (len(entries), read, t)
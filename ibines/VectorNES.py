@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+import numpy
+from NES import NES
+from ppu.PPU import PPU
+from Memory import Memory
+
+
+"""
+VectorNES
+
+Descripción: Avanza K instancias de la NES a la vez, un frame por llamada, con
+una acción (máscara de botones Joypad.BUTTON_* del Joypad 1) por instancia.
+Las instancias se crean con NES.fork, así que comparten la ROM y los tiles
+decodificados. Las imágenes y la RAM se devuelven apiladas en arrays de NumPy
+que se reservan una sola vez y se sobrescriben en cada paso
+"""
+class VectorNES(object):
+
+    def __init__(self, file_name, count, fast_cpu=True):
+        #######################################################################
+        # Variables de instancia
+        #######################################################################
+        nes = NES(file_name, headless=True, fast_cpu=fast_cpu)
+        self._instances = [nes] + nes.fork(count - 1)
+
+        # Estado inicial para reset()
+        self._initial_state = nes.save_state()
+
+        # Imágenes (K, 240, 256) en ARGB y RAM (K, 2048) del último paso
+        self._observations = numpy.zeros((count, PPU.FRAME_HEIGHT, PPU.FRAME_WIDTH), dtype=numpy.uint32)
+        self._rams = numpy.zeros((count, Memory.RAM_SIZE), dtype=numpy.uint8)
+        #######################################################################
+        #######################################################################
+
+
+    # Devuelve el número de instancias
+    def get_count(self):
+        return len(self._instances)
+
+
+    # Devuelve la lista de instancias
+    def get_instances(self):
+        return self._instances
+
+
+    ###############################################################################
+    # Función: step(actions)
+    # Parámetros:
+    #   actions -> secuencia de K máscaras de botones, una por instancia
+    # Descripción: Ejecuta un frame en cada instancia con su acción y devuelve la
+    # tupla (observations, rams) con las imágenes (K, 240, 256) y la RAM (K, 2048).
+    # Los arrays se reutilizan en el siguiente paso: hay que copiarlos para guardarlos
+    ###############################################################################
+    def step(self, actions):
+        if len(actions) != len(self._instances):
+            raise ValueError("Se esperaban %d acciones y se han recibido %d" % (len(self._instances), len(actions)))
+
+        for n, nes in enumerate(self._instances):
+            nes.get_joypad_1().set_buttons(int(actions[n]))
+            nes.step_frame()
+
+        return self._observe()
+
+
+    ###############################################################################
+    # Función: reset(indices)
+    # Parámetros:
+    #   indices -> instancias a reiniciar. Si es None se reinician todas
+    # Descripción: Devuelve las instancias al estado en que se crearon y devuelve
+    # (observations, rams) como step
+    ###############################################################################
+    def reset(self, indices=None):
+        if indices is None:
+            indices = range(len(self._instances))
+
+        for n in indices:
+            nes = self._instances[n]
+            nes.load_state(self._initial_state)
+            nes.get_frame().fill(0)
+
+        return self._observe()
+
+
+    # Copia la imagen y la RAM de cada instancia en los arrays de salida
+    def _observe(self):
+        for n, nes in enumerate(self._instances):
+            self._observations[n] = nes.get_frame()
+            self._rams[n] = numpy.frombuffer(nes.get_ram(), dtype=numpy.uint8)
+
+        return self._observations, self._rams
@@ -1,8 +1,32 @@
 # -*- coding: utf-8 -*-
 
+import array
 import nesutils
 import Instruction
 
+
+###############################################################################
+# Tablas precalculadas de flags del registro de estado
+###############################################################################
+
+# Bits ZERO y SIGN del registro P para cada valor de un byte
+def _build_zn_flags():
+    return [(v & 0x80) | (0x02 if v == 0x00 else 0x00) for v in xrange(256)]
+
+
+# Bits CARRY, ZERO, OVERFLOW y SIGN de una suma con acarreo (ADC). Se indexa con
+# (carry << 16) | (ac << 8) | op. La resta (SBC) usa la misma tabla con el
+# operando complementado (op ^ 0xFF), ya que ac - op - 1 + c = ac + ~op + c
+def _build_adc_flags(zn_flags):
+    table = array.array("B")
+    for c in (0, 1):
+        for ac in xrange(256):
+            table.extend([((ac + op + c) >> 8) |
+                          ((~(ac ^ op) & (ac ^ (ac + op + c)) & 0x80) >> 1) |
+                          zn_flags[(ac + op + c) & 0xFF] for op in xrange(256)])
+
+    return table
+
 """
 CPU
 
@@ -22,8 +46,9 @@ class CPU(object):
     REG_P_BIT_V = 6
     REG_P_BIT_S = 7
 
-    # Frecuencia de la CPU en Hz
-    CPU_FREQ = 1660000
+    # Frecuencia de la CPU en Hz (2A07 de PAL: 26,601712 MHz / 16, la misma
+    # temporización que usa la PPU)
+    CPU_FREQ = 1662607
 
     # Direcciones de memoria vector de interrupciones
     INT_ADDR_VBLANK = 0xFFFA
@@ -33,6 +58,44 @@ class CPU(object):
     # Latencia de interrupción en ciclos
     INT_LATENCY = 7
 
+    # Tipos de ciclos adicionales en el modo de ciclos exactos
+    PENALTY_NONE = 0
+    PENALTY_ABSX = 1            # Lectura indexada absoluta con X: +1 si cruza de página
+    PENALTY_ABSY = 2            # Lectura indexada absoluta con Y: +1 si cruza de página
+    PENALTY_POSTINDEXI = 3      # Lectura post-indexada con Y: +1 si cruza de página
+    PENALTY_BRANCH = 4          # Salto condicional: +1 si salta y otro más si cruza de página
+
+    # Opcodes de cada tipo. Las escrituras y las read-modify-write indexadas
+    # tardan siempre lo mismo, por eso no aparecen
+    PENALTY_OPCODES = {
+        PENALTY_ABSX: (0x7D, 0x3D, 0xDD, 0x5D, 0xBD, 0xBC, 0x1D, 0xFD),
+        PENALTY_ABSY: (0x79, 0x39, 0xD9, 0x59, 0xB9, 0xBE, 0x19, 0xF9),
+        PENALTY_POSTINDEXI: (0x71, 0x31, 0xD1, 0x51, 0xB1, 0x11, 0xF1),
+        PENALTY_BRANCH: (0x90, 0xB0, 0xF0, 0x30, 0xD0, 0x10, 0x50, 0x70),
+    }
+
+    # Condición de cada salto: (máscara de P, valor con el que salta)
+    BRANCH_CONDITIONS = {
+        0x90: (0x01, 0x00), 0xB0: (0x01, 0x01),     # BCC, BCS
+        0xD0: (0x02, 0x00), 0xF0: (0x02, 0x02),     # BNE, BEQ
+        0x50: (0x40, 0x00), 0x70: (0x40, 0x40),     # BVC, BVS
+        0x10: (0x80, 0x00), 0x30: (0x80, 0x80),     # BPL, BMI
+    }
+
+    # Ciclos reales de los opcodes cuyo valor en la tabla de instrucciones no es
+    # exacto. Sólo se usan en el modo de ciclos exactos
+    ACCURATE_CYCLES = {
+        0x00: 7,                # BRK
+    }
+
+    # Tablas de flags
+    ZN_FLAGS = _build_zn_flags()
+    ADC_FLAGS = _build_adc_flags(ZN_FLAGS)
+
+    # Campos del estado guardado con save_state
+    STATE_FIELDS = [("_reg_pc", "H"), ("_reg_sp", "B"), ("_reg_a", "B"), ("_reg_x", "B"),
+                    ("_reg_y", "B"), ("_reg_p", "B"), ("_irq", "B")]
+
     ###########################################################################
     # Métodos públicos
     ###########################################################################
@@ -66,6 +129,19 @@ class CPU(object):
 
         # Pool de instrucciones
         self._inst_pool = Instruction.InstructionPool(self)
+
+        # Modo de ciclos exactos: se suman los ciclos por cruce de página y por
+        # salto tomado. Tablas indexadas por opcode con el tipo de ciclo adicional
+        # y la corrección de los ciclos constantes
+        self._accurate_cycles = False
+        self._penalties = [CPU.PENALTY_NONE] * 256
+        for penalty, opcodes in CPU.PENALTY_OPCODES.items():
+            for opcode in opcodes:
+                self._penalties[opcode] = penalty
+
+        self._cycles_fix = [0] * 256
+        for opcode, cycles in CPU.ACCURATE_CYCLES.items():
+            self._cycles_fix[opcode] = cycles - self._inst_pool.pool[opcode].CYCLES
         #######################################################################
         #######################################################################
 
@@ -82,6 +158,17 @@ class CPU(object):
         self._reg_pc = addr
 
 
+    # Procesa un reset (botón de reset de la consola): salta al vector de reset, el
+    # Stack Pointer baja 3 posiciones sin escribir en la pila y se inhiben las IRQ
+    def reset(self):
+        addr = self._mem.read_data(self.INT_ADDR_RESET) & 0xFF
+        addr = addr | (self._mem.read_data(self.INT_ADDR_RESET + 1) << 8)
+        self._reg_pc = addr
+        self._reg_sp = (self._reg_sp - 3) & 0xFF
+        self.set_reg_p_i_bit(1)
+        self._irq = 0
+
+
     # procesa una interrupción IRQ
     def interrupt_irq(self):
         self._irq = 0
@@ -104,6 +191,16 @@ class CPU(object):
         self._irq = v
 
 
+    # Devuelve el estado de los registros en binario
+    def get_state(self):
+        return nesutils.pack_fields(self, CPU.STATE_FIELDS)
+
+
+    # Restaura el estado de los registros devuelto por get_state
+    def set_state(self, data):
+        nesutils.unpack_fields(self, CPU.STATE_FIELDS, data)
+
+
     # Devuelve una referencia a la memoria
     def get_mem(self):
         return self._mem
@@ -170,6 +267,53 @@ class CPU(object):
         return inst
 
 
+    # Ejecuta la siguiente instrucción y devuelve el número de ciclos que ha tardado
+    def exec_inst(self):
+        if self._accurate_cycles:
+            return self._exec_inst_accurate()
+
+        return self.fetch_inst().execute()
+
+
+    # Ejecuta la siguiente instrucción en el modo de ciclos exactos
+    def _exec_inst_accurate(self):
+        inst = self.fetch_inst()
+        opcode = inst.OPCODE
+        penalty = self._penalties[opcode]
+
+        if penalty == CPU.PENALTY_NONE:
+            return inst.execute() + self._cycles_fix[opcode]
+
+        if penalty == CPU.PENALTY_BRANCH:
+            next_pc = (self._reg_pc + 2) & 0xFFFF
+            cycles = inst.execute()
+            mask, value = CPU.BRANCH_CONDITIONS[opcode]
+            if (self._reg_p & mask) == value:
+                cycles += 1 + (((self._reg_pc ^ next_pc) & 0xFF00) != 0)
+            return cycles
+
+        # Cruza de página si al sumar el índice a la dirección base hay acarreo
+        # en el byte bajo
+        if penalty == CPU.PENALTY_POSTINDEXI:
+            i = inst.get_operand()
+            base = self._mem.read_data(i) | (self._mem.read_data((i + 1) & 0xFF) << 8)
+            index = self._reg_y
+        else:
+            base = inst.get_operand()
+            index = self._reg_x if penalty == CPU.PENALTY_ABSX else self._reg_y
+
+        return inst.execute() + (((base & 0xFF) + index) > 0xFF)
+
+
+    # Activa o desactiva el modo de ciclos exactos
+    def set_accurate_cycles(self, accurate):
+        self._accurate_cycles = accurate
+
+
+    def get_accurate_cycles(self):
+        return self._accurate_cycles
+
+
     # Devuelve el valor de los bits del registro de estado
     def get_reg_p_c_bit(self):
         return nesutils.get_bit(self._reg_p, self.REG_P_BIT_C)
@@ -243,6 +387,22 @@ class CPU(object):
             self.set_reg_p_s_bit(0)
             return 0
 
+    # Establece los bits ZERO y SIGN en función del resultado con una sola operación
+    def set_zn_bits(self, inst_result):
+        self._reg_p = (self._reg_p & 0x7D) | CPU.ZN_FLAGS[inst_result & 0xFF]
+
+    # Establece los bits CARRY, ZERO y SIGN. "carry" tiene que ser 0 o 1
+    def set_czn_bits(self, carry, inst_result):
+        self._reg_p = (self._reg_p & 0x7C) | carry | CPU.ZN_FLAGS[inst_result & 0xFF]
+
+    # Establece los bits CARRY, ZERO, OVERFLOW y SIGN de una suma ac + op + carry
+    def set_adc_bits(self, ac, op, carry):
+        self._reg_p = (self._reg_p & 0x3C) | CPU.ADC_FLAGS[(carry << 16) | (ac << 8) | op]
+
+    # Establece los bits CARRY, ZERO, OVERFLOW y SIGN de una resta ac - op - 1 + carry
+    def set_sbc_bits(self, ac, op, carry):
+        self._reg_p = (self._reg_p & 0x3C) | CPU.ADC_FLAGS[(carry << 16) | (ac << 8) | (op ^ 0xFF)]
+
     # Funciones para meter y sacar datos de la Pila
     def push_stack(self, byte):
         sp_addr = 0x0100 | self.get_reg_sp()
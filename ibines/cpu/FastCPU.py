@@ -0,0 +1,522 @@
+# -*- coding: utf-8 -*-
+
+from CPU import CPU, OpcodeError
+
+"""
+FastCPU
+
+Descripción: Implementación alternativa de la CPU optimizada para velocidad.
+Cada opcode es una única función plana que trabaja sobre una lista de registros
+local, con el modo de direccionamiento ya integrado. Las funciones se generan a
+partir de las tablas de este módulo y se compilan una sola vez al importarlo.
+La jerarquía de clases de Instruction.py se mantiene como implementación de
+referencia.
+"""
+
+###############################################################################
+# Índices de los registros en la lista de registros
+###############################################################################
+PC = 0
+SP = 1
+A = 2
+X = 3
+Y = 4
+P = 5
+
+
+###############################################################################
+# Modos de direccionamiento. Cada uno es el código que calcula la dirección
+# efectiva "addr" a partir de "pc" (dirección del opcode)
+###############################################################################
+_ADDR_MODES = {
+    "zero": "addr = read(pc + 1)",
+    "zerox": "addr = (read(pc + 1) + r[3]) & 0xFF",
+    "zeroy": "addr = (read(pc + 1) + r[4]) & 0xFF",
+    "abs": "addr = read(pc + 1) | (read(pc + 2) << 8)",
+    "absx": "addr = ((read(pc + 1) | (read(pc + 2) << 8)) + r[3]) & 0xFFFF",
+    "absy": "addr = ((read(pc + 1) | (read(pc + 2) << 8)) + r[4]) & 0xFFFF",
+    "preindexi": "i = (read(pc + 1) + r[3]) & 0xFF\n"
+                 "addr = read(i) | (read((i + 1) & 0xFF) << 8)",
+    "postindexi": "i = read(pc + 1)\n"
+                  "addr = ((read(i) | (read((i + 1) & 0xFF) << 8)) + r[4]) & 0xFFFF",
+}
+
+# Modos de direccionamiento en los que las instrucciones de lectura tardan un
+# ciclo más si la dirección efectiva cruza de página (modo de ciclos exactos).
+# Además de "addr" dejan en "base" la dirección antes de sumar el índice
+_PAGE_CROSS_MODES = {
+    "absx": "base = read(pc + 1) | (read(pc + 2) << 8)\n"
+            "addr = (base + r[3]) & 0xFFFF",
+    "absy": "base = read(pc + 1) | (read(pc + 2) << 8)\n"
+            "addr = (base + r[4]) & 0xFFFF",
+    "postindexi": "i = read(pc + 1)\n"
+                  "base = read(i) | (read((i + 1) & 0xFF) << 8)\n"
+                  "addr = (base + r[4]) & 0xFFFF",
+}
+
+# Bytes que ocupa cada modo de direccionamiento
+_MODE_BYTES = {
+    "implied": 1,
+    "accumulator": 1,
+    "inmediate": 2,
+    "relative": 2,
+    "zero": 2,
+    "zerox": 2,
+    "zeroy": 2,
+    "abs": 3,
+    "absx": 3,
+    "absy": 3,
+    "indirect": 3,
+    "preindexi": 2,
+    "postindexi": 2,
+}
+
+
+###############################################################################
+# Tabla de opcodes: (opcode, instrucción, modo de direccionamiento, ciclos).
+# Los ciclos son los mismos que los de la implementación de referencia.
+###############################################################################
+_OPCODES = [
+    (0x69, "ADC", "inmediate", 2), (0x65, "ADC", "zero", 3), (0x75, "ADC", "zerox", 4),
+    (0x6D, "ADC", "abs", 4), (0x7D, "ADC", "absx", 4), (0x79, "ADC", "absy", 4),
+    (0x61, "ADC", "preindexi", 6), (0x71, "ADC", "postindexi", 5),
+
+    (0x29, "AND", "inmediate", 2), (0x25, "AND", "zero", 3), (0x35, "AND", "zerox", 4),
+    (0x2D, "AND", "abs", 4), (0x3D, "AND", "absx", 4), (0x39, "AND", "absy", 4),
+    (0x21, "AND", "preindexi", 6), (0x31, "AND", "postindexi", 5),
+
+    (0x0A, "ASL", "accumulator", 2), (0x06, "ASL", "zero", 5), (0x16, "ASL", "zerox", 6),
+    (0x0E, "ASL", "abs", 6), (0x1E, "ASL", "absx", 7),
+
+    (0x90, "BCC", "relative", 2), (0xB0, "BCS", "relative", 2), (0xF0, "BEQ", "relative", 2),
+    (0x30, "BMI", "relative", 2), (0xD0, "BNE", "relative", 2), (0x10, "BPL", "relative", 2),
+    (0x50, "BVC", "relative", 2), (0x70, "BVS", "relative", 2),
+
+    (0x24, "BIT", "zero", 3), (0x2C, "BIT", "abs", 4),
+
+    (0x00, "BRK", "implied", 2),
+
+    (0x18, "CLC", "implied", 2), (0xD8, "CLD", "implied", 2), (0x58, "CLI", "implied", 2),
+    (0xB8, "CLV", "implied", 2),
+
+    (0xC9, "CMP", "inmediate", 2), (0xC5, "CMP", "zero", 3), (0xD5, "CMP", "zerox", 4),
+    (0xCD, "CMP", "abs", 4), (0xDD, "CMP", "absx", 4), (0xD9, "CMP", "absy", 4),
+    (0xC1, "CMP", "preindexi", 6), (0xD1, "CMP", "postindexi", 5),
+
+    (0xE0, "CPX", "inmediate", 2), (0xE4, "CPX", "zero", 3), (0xEC, "CPX", "abs", 4),
+    (0xC0, "CPY", "inmediate", 2), (0xC4, "CPY", "zero", 3), (0xCC, "CPY", "abs", 4),
+
+    (0xC6, "DEC", "zero", 5), (0xD6, "DEC", "zerox", 6), (0xCE, "DEC", "abs", 6),
+    (0xDE, "DEC", "absx", 7),
+    (0xCA, "DEX", "implied", 2), (0x88, "DEY", "implied", 2),
+
+    (0x49, "EOR", "inmediate", 2), (0x45, "EOR", "zero", 3), (0x55, "EOR", "zerox", 4),
+    (0x4D, "EOR", "abs", 4), (0x5D, "EOR", "absx", 4), (0x59, "EOR", "absy", 4),
+    (0x41, "EOR", "preindexi", 6), (0x51, "EOR", "postindexi", 5),
+
+    (0xE6, "INC", "zero", 5), (0xF6, "INC", "zerox", 6), (0xEE, "INC", "abs", 6),
+    (0xFE, "INC", "absx", 7),
+    (0xE8, "INX", "implied", 2), (0xC8, "INY", "implied", 2),
+
+    (0x4C, "JMP", "abs", 3), (0x6C, "JMP", "indirect", 5),
+    (0x20, "JSR", "abs", 6),
+
+    (0xA9, "LDA", "inmediate", 2), (0xA5, "LDA", "zero", 3), (0xB5, "LDA", "zerox", 4),
+    (0xAD, "LDA", "abs", 4), (0xBD, "LDA", "absx", 4), (0xB9, "LDA", "absy", 4),
+    (0xA1, "LDA", "preindexi", 6), (0xB1, "LDA", "postindexi", 5),
+
+    (0xA2, "LDX", "inmediate", 2), (0xA6, "LDX", "zero", 3), (0xB6, "LDX", "zeroy", 4),
+    (0xAE, "LDX", "abs", 4), (0xBE, "LDX", "absy", 4),
+
+    (0xA0, "LDY", "inmediate", 2), (0xA4, "LDY", "zero", 3), (0xB4, "LDY", "zerox", 4),
+    (0xAC, "LDY", "abs", 4), (0xBC, "LDY", "absx", 4),
+
+    (0x4A, "LSR", "accumulator", 2), (0x46, "LSR", "zero", 5), (0x56, "LSR", "zerox", 6),
+    (0x4E, "LSR", "abs", 6), (0x5E, "LSR", "absx", 7),
+
+    (0xEA, "NOP", "implied", 2),
+
+    (0x09, "ORA", "inmediate", 2), (0x05, "ORA", "zero", 3), (0x15, "ORA", "zerox", 4),
+    (0x0D, "ORA", "abs", 4), (0x1D, "ORA", "absx", 4), (0x19, "ORA", "absy", 4),
+    (0x01, "ORA", "preindexi", 6), (0x11, "ORA", "postindexi", 5),
+
+    (0x48, "PHA", "implied", 3), (0x08, "PHP", "implied", 3),
+    (0x68, "PLA", "implied", 4), (0x28, "PLP", "implied", 4),
+
+    (0x2A, "ROL", "accumulator", 2), (0x26, "ROL", "zero", 5), (0x36, "ROL", "zerox", 6),
+    (0x2E, "ROL", "abs", 6), (0x3E, "ROL", "absx", 7),
+
+    (0x6A, "ROR", "accumulator", 2), (0x66, "ROR", "zero", 5), (0x76, "ROR", "zerox", 6),
+    (0x6E, "ROR", "abs", 6), (0x7E, "ROR", "absx", 7),
+
+    (0x40, "RTI", "implied", 6), (0x60, "RTS", "implied", 6),
+
+    (0xE9, "SBC", "inmediate", 2), (0xE5, "SBC", "zero", 3), (0xF5, "SBC", "zerox", 4),
+    (0xED, "SBC", "abs", 4), (0xFD, "SBC", "absx", 4), (0xF9, "SBC", "absy", 4),
+    (0xE1, "SBC", "preindexi", 6), (0xF1, "SBC", "postindexi", 5),
+
+    (0x38, "SEC", "implied", 2), (0xF8, "SED", "implied", 2), (0x78, "SEI", "implied", 2),
+
+    (0x85, "STA", "zero", 3), (0x95, "STA", "zerox", 4), (0x8D, "STA", "abs", 4),
+    (0x9D, "STA", "absx", 5), (0x99, "STA", "absy", 5), (0x81, "STA", "preindexi", 6),
+    (0x91, "STA", "postindexi", 6),
+
+    (0x86, "STX", "zero", 3), (0x96, "STX", "zeroy", 4), (0x8E, "STX", "abs", 4),
+    (0x84, "STY", "zero", 3), (0x94, "STY", "zerox", 4), (0x8C, "STY", "abs", 4),
+
+    (0xAA, "TAX", "implied", 2), (0xA8, "TAY", "implied", 2), (0xBA, "TSX", "implied", 2),
+    (0x8A, "TXA", "implied", 2), (0x9A, "TXS", "implied", 2), (0x98, "TYA", "implied", 2),
+]
+
+# Ciclos reales de los opcodes cuyo valor en la tabla no es exacto (modo de ciclos exactos)
+_ACCURATE_CYCLES = CPU.ACCURATE_CYCLES
+
+
+###############################################################################
+# Fragmentos de código de cada instrucción. En las que leen un operando éste
+# está en "v". En las que escriben en memoria la dirección está en "addr" y en
+# las de acumulador/memoria (read-modify-write) el resultado se deja en "res".
+# Los flags se actualizan con una sola operación sobre el registro P usando las
+# tablas precalculadas de CPU.
+###############################################################################
+
+# Expresión con los bits Zero y Sign correspondientes al byte "x" (tabla CPU.ZN_FLAGS)
+def _zn(x):
+    return "zn[%s]" % x
+
+
+_LOGIC = "res = r[2] %s v\nr[2] = res\nr[5] = (r[5] & 0x7D) | " + _zn("res")
+_LOAD = "r[%d] = v\nr[5] = (r[5] & 0x7D) | " + _zn("v")
+_COMPARE = "t = r[%d] - v\nr[5] = (r[5] & 0x7C) | (t >= 0) | " + _zn("t & 0xFF")
+_INCDEC_REG = "res = (r[%d] %s 1) & 0xFF\nr[%d] = res\nr[5] = (r[5] & 0x7D) | " + _zn("res")
+_TRANSFER = "res = r[%d]\nr[%d] = res\nr[5] = (r[5] & 0x7D) | " + _zn("res")
+_BRANCH = "if %s:\n    pc = (pc + (v ^ 0x80) - 0x80) & 0xFFFF"
+# En el modo de ciclos exactos el salto tomado tarda uno más y otro si cruza de página
+_BRANCH_ACCURATE = ("if %s:\n"
+                    "    t = (pc + (v ^ 0x80) - 0x80) & 0xFFFF\n"
+                    "    r[0] = t\n"
+                    "    return %d + (((pc ^ t) & 0xFF00) != 0)")
+_PUSH = "sp = r[1]\nwrite(%s, 0x100 | sp)\nr[1] = (sp - 1) & 0xFF"
+_PULL = "sp = (r[1] + 1) & 0xFF\nr[1] = sp\n%s = read(0x100 | sp)"
+
+# Instrucciones que leen un operando "v"
+_READ_OPS = {
+    # Los flags de la suma y la resta salen de la tabla CPU.ADC_FLAGS
+    "ADC": "a = r[2]\n"
+           "c = r[5] & 0x01\n"
+           "r[2] = (a + v + c) & 0xFF\n"
+           "r[5] = (r[5] & 0x3C) | adc[(c << 16) | (a << 8) | v]",
+    "SBC": "a = r[2]\n"
+           "c = r[5] & 0x01\n"
+           "r[2] = (a - v - 1 + c) & 0xFF\n"
+           "r[5] = (r[5] & 0x3C) | adc[(c << 16) | (a << 8) | (v ^ 0xFF)]",
+    "AND": _LOGIC % "&",
+    "ORA": _LOGIC % "|",
+    "EOR": _LOGIC % "^",
+    "LDA": _LOAD % A,
+    "LDX": _LOAD % X,
+    "LDY": _LOAD % Y,
+    "CMP": _COMPARE % A,
+    "CPX": _COMPARE % X,
+    "CPY": _COMPARE % Y,
+    "BIT": "r[5] = (r[5] & 0x3D) | (v & 0xC0) | (zn[v & r[2]] & 0x02)",
+}
+
+# Instrucciones read-modify-write sobre el operando "v" que dejan el resultado en "res"
+_RMW_OPS = {
+    "ASL": "t = v << 1\nres = t & 0xFF\nr[5] = (r[5] & 0x7C) | (t >> 8) | " + _zn("res"),
+    "ROL": "t = (v << 1) | (r[5] & 0x01)\nres = t & 0xFF\nr[5] = (r[5] & 0x7C) | (t >> 8) | " + _zn("res"),
+    "LSR": "res = v >> 1\nr[5] = (r[5] & 0x7C) | (v & 0x01) | " + _zn("res"),
+    "ROR": "res = (v >> 1) | ((r[5] & 0x01) << 7)\nr[5] = (r[5] & 0x7C) | (v & 0x01) | " + _zn("res"),
+    "INC": "res = (v + 1) & 0xFF\nr[5] = (r[5] & 0x7D) | " + _zn("res"),
+    "DEC": "res = (v - 1) & 0xFF\nr[5] = (r[5] & 0x7D) | " + _zn("res"),
+}
+
+# Instrucciones de almacenamiento: registro que se escribe en "addr"
+_STORE_OPS = {
+    "STA": A,
+    "STX": X,
+    "STY": Y,
+}
+
+# Saltos condicionales: condición con la que se toma el salto
+_BRANCH_OPS = {
+    "BCC": "not (r[5] & 0x01)",
+    "BCS": "r[5] & 0x01",
+    "BNE": "not (r[5] & 0x02)",
+    "BEQ": "r[5] & 0x02",
+    "BVC": "not (r[5] & 0x40)",
+    "BVS": "r[5] & 0x40",
+    "BPL": "not (r[5] & 0x80)",
+    "BMI": "r[5] & 0x80",
+}
+
+
+# Instrucciones de modo implícito
+_IMPLIED_OPS = {
+    "CLC": "r[5] &= 0xFE",
+    "CLD": "r[5] &= 0xF7",
+    "CLI": "r[5] &= 0xFB",
+    "CLV": "r[5] &= 0xBF",
+    "SEC": "r[5] |= 0x01",
+    "SED": "r[5] |= 0x08",
+    "SEI": "r[5] |= 0x04",
+    "DEX": _INCDEC_REG % (X, "-", X),
+    "DEY": _INCDEC_REG % (Y, "-", Y),
+    "INX": _INCDEC_REG % (X, "+", X),
+    "INY": _INCDEC_REG % (Y, "+", Y),
+    "TAX": _TRANSFER % (A, X),
+    "TAY": _TRANSFER % (A, Y),
+    "TSX": _TRANSFER % (SP, X),
+    "TXA": _TRANSFER % (X, A),
+    "TYA": _TRANSFER % (Y, A),
+    "TXS": "r[1] = r[3]",
+    "NOP": "pass",
+    "PHA": _PUSH % "r[2]",
+    # Los bit 4 y 5 se ponen siempre a 1
+    "PHP": _PUSH % "r[5] | 0x30",
+    "PLA": (_PULL % "res") + "\nr[2] = res\nr[5] = (r[5] & 0x7D) | " + _zn("res"),
+    "PLP": _PULL % "r[5]",
+}
+
+
+# Sangra un fragmento de código
+def _indent(code, level=1):
+    return "\n".join(("    " * level) + line for line in code.split("\n"))
+
+
+# Devuelve la posición del paréntesis que cierra el que hay en "start" y las
+# posiciones de las comas de primer nivel que hay entre ambos
+def _split_call(code, start):
+    level = 0
+    commas = []
+    for i in range(start, len(code)):
+        c = code[i]
+        if c == "(":
+            level += 1
+        elif c == ")":
+            level -= 1
+            if level == 0:
+                return i, commas
+        elif c == "," and level == 1:
+            commas.append(i)
+
+    raise ValueError("Paréntesis sin cerrar: " + code)
+
+
+# Direcciones de las que se conoce la página: pila y punteros de página cero
+_KNOWN_PAGES = {
+    "0x100 | sp": ("1", "sp"),
+    "i": ("0", "i"),
+    "(i + 1) & 0xFF": ("0", "(i + 1) & 0xFF"),
+}
+
+
+# Devuelve los índices "[página][desplazamiento]" de la tabla de páginas para la dirección "a"
+def _page_index(a):
+    if a in _KNOWN_PAGES:
+        return "[%s][%s]" % _KNOWN_PAGES[a]
+    elif a.startswith("0x"):
+        n = int(a, 16)
+        return "[0x%02X][0x%02X]" % (n >> 8, n & 0xFF)
+    elif "pc +" in a:
+        # pc + n puede pasar de 0xFFFF
+        return "[((%s) >> 8) & 0xFF][(%s) & 0xFF]" % (a, a)
+    else:
+        return "[%s >> 8][%s & 0xFF]" % (a, a) if a.isalnum() else "[(%s) >> 8][(%s) & 0xFF]" % (a, a)
+
+
+# Sustituye las llamadas read(addr) y write(data, addr) de un fragmento por el
+# acceso directo a las tablas de páginas de la memoria "rd" y "wr"
+def _inline_mem(code):
+    for name in ("read(", "write("):
+        i = code.find(name)
+        while i >= 0:
+            end, commas = _split_call(code, i + len(name) - 1)
+            if name == "read(":
+                access = "rd" + _page_index(code[i + 5:end].strip())
+            else:
+                # Todas las escrituras de la CPU tienen el dato dentro de rango
+                access = "wr%s = %s" % (_page_index(code[commas[0] + 1:end].strip()), code[i + 6:commas[0]])
+            code = code[:i] + access + code[end + 1:]
+            i = code.find(name, i + len(access))
+
+    return code
+
+
+# Genera el código fuente de la función de un opcode. Si "accurate" es True la
+# función devuelve los ciclos exactos (cruces de página y saltos tomados)
+def _gen_opcode(opcode, name, mode, cycles, accurate=False):
+    size = _MODE_BYTES[mode]
+    body = ["pc = r[0]"]
+    end_pc = "r[0] = (pc + %d) & 0xFFFF" % size
+    if accurate:
+        cycles = _ACCURATE_CYCLES.get(opcode, cycles)
+    ret = "return %d" % cycles
+
+    if name in _READ_OPS:
+        if mode == "inmediate":
+            body.append("v = read(pc + 1)")
+        elif accurate and mode in _PAGE_CROSS_MODES:
+            body.append(_PAGE_CROSS_MODES[mode])
+            body.append("v = read(addr)")
+            ret = "return %d + (((base & 0xFF) + r[%d]) > 0xFF)" % (cycles, X if mode == "absx" else Y)
+        else:
+            body.append(_ADDR_MODES[mode])
+            body.append("v = read(addr)")
+        body.append(_READ_OPS[name])
+        body.append(end_pc)
+    elif name in _RMW_OPS:
+        if mode == "accumulator":
+            body.append("v = r[2]")
+            body.append(_RMW_OPS[name])
+            body.append("r[2] = res")
+        else:
+            body.append(_ADDR_MODES[mode])
+            body.append("v = read(addr)")
+            body.append(_RMW_OPS[name])
+            body.append("write(res, addr)")
+        body.append(end_pc)
+    elif name in _STORE_OPS:
+        body.append(_ADDR_MODES[mode])
+        body.append("write(r[%d], addr)" % _STORE_OPS[name])
+        body.append(end_pc)
+        # La escritura en 0x4014 lanza una transferencia DMA de sprites
+        body.append("if addr == 0x4014:\n    return %d" % (cycles + 512))
+    elif name in _BRANCH_OPS:
+        body.append("v = read(pc + 1)")
+        body.append("pc = (pc + 2) & 0xFFFF")
+        if accurate:
+            body.append(_BRANCH_ACCURATE % (_BRANCH_OPS[name], cycles + 1))
+        else:
+            body.append(_BRANCH % _BRANCH_OPS[name])
+        body.append("r[0] = pc")
+    elif name in _IMPLIED_OPS:
+        body.append(_IMPLIED_OPS[name])
+        body.append(end_pc)
+    elif name == "JMP" and mode == "abs":
+        body.append(_ADDR_MODES["abs"])
+        body.append("r[0] = addr")
+    elif name == "JMP":
+        # El byte alto se lee sin pasar de página (bug del 6502)
+        body.append(_ADDR_MODES["abs"])
+        body.append("r[0] = read(addr) | (read((addr & 0xFF00) | ((addr + 1) & 0xFF)) << 8)")
+    elif name == "JSR":
+        body.append(_ADDR_MODES["abs"])
+        body.append("ret = pc + 2")
+        body.append(_PUSH % "(ret >> 8) & 0xFF")
+        body.append(_PUSH % "ret & 0xFF")
+        body.append("r[0] = addr")
+    elif name == "RTS":
+        body.append(_PULL % "lo")
+        body.append(_PULL % "hi")
+        body.append("r[0] = (((hi << 8) | lo) + 1) & 0xFFFF")
+    elif name == "RTI":
+        body.append(_PULL % "r[5]")
+        body.append(_PULL % "lo")
+        body.append(_PULL % "hi")
+        body.append("r[0] = (hi << 8) | lo")
+    elif name == "BRK":
+        body.append("ret = pc + 2")
+        body.append(_PUSH % "(ret >> 8) & 0xFF")
+        body.append(_PUSH % "ret & 0xFF")
+        body.append("r[5] |= 0x10")
+        body.append(_PUSH % "r[5] | 0x30")
+        body.append("r[5] |= 0x04")
+        body.append("r[0] = read(0xFFFE) | (read(0xFFFF) << 8)")
+    else:
+        raise ValueError("Instrucción desconocida: " + name)
+
+    # Si no hay ya un return al final se añade
+    body.append(ret)
+
+    return "def op_%02X():\n%s\n" % (opcode, _indent(_inline_mem("\n".join(body))))
+
+
+# Genera el código fuente de la función "name" que construye la tabla de
+# opcodes. Las funciones de los opcodes son closures sobre la lista de
+# registros, las tablas de páginas de la memoria y las tablas de flags
+def _gen_make_ops(name, accurate=False):
+    src = ["def %s(r, rd, wr, unknown, zn, adc):" % name]
+    src.append("    ops = [unknown] * 256")
+    for opcode, op_name, mode, cycles in _OPCODES:
+        src.append(_indent(_gen_opcode(opcode, op_name, mode, cycles, accurate)))
+        src.append("    ops[0x%02X] = op_%02X" % (opcode, opcode))
+    src.append("    return ops")
+
+    return "\n".join(src)
+
+
+# Se compila una sola vez al importar el módulo
+_namespace = {}
+exec compile(_gen_make_ops("make_ops") + "\n\n" + _gen_make_ops("make_accurate_ops", True),
+             "<FastCPU opcodes>", "exec") in _namespace
+_make_ops = _namespace["make_ops"]
+_make_accurate_ops = _namespace["make_accurate_ops"]
+
+
+# Crea una propiedad que enlaza un atributo de registro con su posición en la lista de registros
+def _reg_property(index):
+    def getter(self):
+        return self._regs[index]
+
+    def setter(self, value):
+        self._regs[index] = value
+
+    return property(getter, setter)
+
+
+"""
+FastCPU
+
+Descripción: CPU con la tabla de opcodes precompilada. Mantiene la misma
+interfaz que CPU, de forma que el resto del sistema (interrupciones, PPU,
+mappers...) no distingue entre ambas implementaciones.
+"""
+class FastCPU(CPU):
+
+    # Los registros se guardan en una lista para que las funciones de los
+    # opcodes puedan modificarlos sin acceder a atributos del objeto
+    _reg_pc = _reg_property(PC)
+    _reg_sp = _reg_property(SP)
+    _reg_a = _reg_property(A)
+    _reg_x = _reg_property(X)
+    _reg_y = _reg_property(Y)
+    _reg_p = _reg_property(P)
+
+    def __init__(self, mem, ppu):
+        # Lista de registros [PC, SP, A, X, Y, P]
+        self._regs = [0x0000, 0xFF, 0x00, 0x00, 0x00, 0x34]
+
+        super(FastCPU, self).__init__(mem, ppu)
+
+        # Tabla de páginas de lectura para leer el opcode
+        self._read_pages = mem.get_read_pages()
+
+        # Tabla de funciones indexada por opcode
+        self._ops = self._build_ops(_make_ops)
+
+
+    # Construye la tabla de funciones de los opcodes con "make_ops"
+    def _build_ops(self, make_ops):
+        return make_ops(self._regs, self._mem.get_read_pages(), self._mem.get_write_pages(),
+                        self._unknown_opcode, CPU.ZN_FLAGS, CPU.ADC_FLAGS)
+
+
+    # Activa o desactiva el modo de ciclos exactos. Cada modo tiene su propia
+    # tabla de opcodes, así que el coste sólo se paga en las instrucciones afectadas
+    def set_accurate_cycles(self, accurate):
+        self._accurate_cycles = accurate
+        self._ops = self._build_ops(_make_accurate_ops if accurate else _make_ops)
+
+
+    # Ejecuta la siguiente instrucción y devuelve el número de ciclos que ha tardado
+    def exec_inst(self):
+        pc = self._regs[PC]
+        return self._ops[self._read_pages[pc >> 8][pc & 0xFF]]()
+
+
+    # Se ejecuta cuando el opcode no está implementado
+    def _unknown_opcode(self):
+        pc = self._regs[PC]
+        raise OpcodeError(pc, self._mem.read_data(pc))
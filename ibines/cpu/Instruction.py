@@ -106,20 +106,8 @@ class ADC(Instruction):
 
         rst = ac + op + carry
 
-        # Establece el bit CARRY del registro P
-        self._cpu.set_carry_bit(rst)
-
-        # Establece el bit ZERO del registro P
-        self._cpu.set_zero_bit(rst)
-
-        # Establece el bit OVERFLOW del registro P
-        if ((not ((ac ^ op) & 0x80)) and ((ac ^ rst) & 0x80)):
-            self._cpu.set_reg_p_v_bit(1)
-        else:
-            self._cpu.set_reg_p_v_bit(0)
-
-        # Establece el bit SIGN del registro P
-        self._cpu.set_sign_bit(rst)
+        # Establece los bits CARRY, ZERO, OVERFLOW y SIGN del registro P
+        self._cpu.set_adc_bits(ac, op, carry)
 
         self._cpu.set_reg_a(rst)
 
@@ -270,8 +258,7 @@ class AND(Instruction):
         ac = self._cpu.get_reg_a()
         result = ac & op
 
-        self._cpu.set_sign_bit(result)
-        self._cpu.set_zero_bit(result)
+        self._cpu.set_zn_bits(result)
 
         self._cpu.set_reg_a(result)
 
@@ -416,9 +403,7 @@ class ASL(Instruction):
     def execute(self, op):
         result = op << 1
 
-        self._cpu.set_carry_bit(result)
-        self._cpu.set_sign_bit(result)
-        self._cpu.set_zero_bit(result)
+        self._cpu.set_czn_bits(result >> 8, result)
 
         return result & 0xFF
 
@@ -614,23 +599,9 @@ class BIT(Instruction):
         addr = self.fetch_absolute_addrmode()
         op = self._cpu.get_mem().read_data(addr)
 
-        # Transfiere el bit de Signo
-        if op & 0x80:
-            self._cpu.set_reg_p_s_bit(1)
-        else:
-            self._cpu.set_reg_p_s_bit(0)
-
-        # Transfiere el bit de Overflow
-        if op & 0x40:
-            self._cpu.set_reg_p_v_bit(1)
-        else:
-            self._cpu.set_reg_p_v_bit(0)
-
-        # Calcula el bit Zero
-        if not(op & self._cpu.get_reg_a()):
-            self._cpu.set_reg_p_z_bit(1)
-        else:
-            self._cpu.set_reg_p_z_bit(0)
+        # Transfiere los bits de Signo y Overflow y calcula el bit Zero
+        zero = self._cpu.ZN_FLAGS[op & self._cpu.get_reg_a()] & 0x02
+        self._cpu.set_reg_p((self._cpu.get_reg_p() & 0x3D) | (op & 0xC0) | zero)
 
         # Incrementa el registro contador (PC) de la CPU
         self._cpu.incr_pc(self.BYTES)
@@ -914,13 +885,7 @@ class CMP(Instruction):
         ac = self._cpu.get_reg_a()
         result = ac - op
 
-        if 0 <= result < 0x100:
-            self._cpu.set_reg_p_c_bit(1)
-        else:
-            self._cpu.set_reg_p_c_bit(0)
-
-        self._cpu.set_sign_bit(result)
-        self._cpu.set_zero_bit(result)
+        self._cpu.set_czn_bits(result >= 0, result)
 
         # Incrementa el registro contador (PC) de la CPU
         self._cpu.incr_pc(self.BYTES)
@@ -1066,13 +1031,7 @@ class CPX(Instruction):
         reg_x = self._cpu.get_reg_x()
         result = reg_x - op
 
-        if 0 <= result < 0x100:
-            self._cpu.set_reg_p_c_bit(1)
-        else:
-            self._cpu.set_reg_p_c_bit(0)
-
-        self._cpu.set_sign_bit(result)
-        self._cpu.set_zero_bit(result)
+        self._cpu.set_czn_bits(result >= 0, result)
 
         # Incrementa el registro contador (PC) de la CPU
         self._cpu.incr_pc(self.BYTES)
@@ -1138,13 +1097,7 @@ class CPY(Instruction):
         reg_y = self._cpu.get_reg_y()
         result = reg_y - op
 
-        if 0 <= result < 0x100:
-            self._cpu.set_reg_p_c_bit(1)
-        else:
-            self._cpu.set_reg_p_c_bit(0)
-
-        self._cpu.set_sign_bit(result)
-        self._cpu.set_zero_bit(result)
+        self._cpu.set_czn_bits(result >= 0, result)
 
         # Incrementa el registro contador (PC) de la CPU
         self._cpu.incr_pc(self.BYTES)
@@ -1209,8 +1162,7 @@ class DEC(Instruction):
     def execute(self, op):
         result = (op - 1) & 0xFF
 
-        self._cpu.set_sign_bit(result)
-        self._cpu.set_zero_bit(result)
+        self._cpu.set_zn_bits(result)
 
         return result
 
@@ -1318,8 +1270,7 @@ class DEX(Instruction):
     def execute(self):
         result = (self._cpu.get_reg_x() - 1) & 0xFF
 
-        self._cpu.set_sign_bit(result)
-        self._cpu.set_zero_bit(result)
+        self._cpu.set_zn_bits(result)
 
         self._cpu.set_reg_x(result)
 
@@ -1346,8 +1297,7 @@ class DEY(Instruction):
     def execute(self):
         result = (self._cpu.get_reg_y() - 1) & 0xFF
 
-        self._cpu.set_sign_bit(result)
-        self._cpu.set_zero_bit(result)
+        self._cpu.set_zn_bits(result)
 
         self._cpu.set_reg_y(result)
 
@@ -1375,8 +1325,7 @@ class EOR(Instruction):
         ac = self._cpu.get_reg_a()
         result = ac ^ op
 
-        self._cpu.set_sign_bit(result)
-        self._cpu.set_zero_bit(result)
+        self._cpu.set_zn_bits(result)
 
         self._cpu.set_reg_a(result)
 
@@ -1523,8 +1472,7 @@ class INC(Instruction):
     def execute(self, op):
         result = (op + 1) & 0xFF
 
-        self._cpu.set_sign_bit(result)
-        self._cpu.set_zero_bit(result)
+        self._cpu.set_zn_bits(result)
 
         return result
 
@@ -1632,8 +1580,7 @@ class INX(Instruction):
     def execute(self):
         result = (self._cpu.get_reg_x() + 1) & 0xFF
 
-        self._cpu.set_sign_bit(result)
-        self._cpu.set_zero_bit(result)
+        self._cpu.set_zn_bits(result)
 
         self._cpu.set_reg_x(result)
 
@@ -1660,8 +1607,7 @@ class INY(Instruction):
     def execute(self):
         result = (self._cpu.get_reg_y() + 1) & 0xFF
 
-        self._cpu.set_sign_bit(result)
-        self._cpu.set_zero_bit(result)
+        self._cpu.set_zn_bits(result)
 
         self._cpu.set_reg_y(result)
 
@@ -1762,10 +1708,8 @@ class LDA(Instruction):
         super(LDA, self).__init__(operand, cpu)
 
     def execute(self, op):
-        # Establece el bit ZERO del registro P
-        self._cpu.set_zero_bit(op)
-        # Establece el bit SIGN del registro P
-        self._cpu.set_sign_bit(op)
+        # Establece los bits ZERO y SIGN del registro P
+        self._cpu.set_zn_bits(op)
 
         self._cpu.set_reg_a(op)
 
@@ -1910,10 +1854,8 @@ class LDX(Instruction):
         super(LDX, self).__init__(operand, cpu)
 
     def execute(self, op):
-        # Establece el bit ZERO del registro P
-        self._cpu.set_zero_bit(op)
-        # Establece el bit SIGN del registro P
-        self._cpu.set_sign_bit(op)
+        # Establece los bits ZERO y SIGN del registro P
+        self._cpu.set_zn_bits(op)
 
         self._cpu.set_reg_x(op)
 
@@ -2010,10 +1952,8 @@ class LDY(Instruction):
         super(LDY, self).__init__(operand, cpu)
 
     def execute(self, op):
-        # Establece el bit ZERO del registro P
-        self._cpu.set_zero_bit(op)
-        # Establece el bit SIGN del registro P
-        self._cpu.set_sign_bit(op)
+        # Establece los bits ZERO y SIGN del registro P
+        self._cpu.set_zn_bits(op)
 
         self._cpu.set_reg_y(op)
 
@@ -2112,9 +2052,7 @@ class LSR(Instruction):
     def execute(self, op):
         result = op >> 1
 
-        self._cpu.set_reg_p_c_bit(op & 0x01)
-        self._cpu.set_reg_p_s_bit(0)
-        self._cpu.set_zero_bit(result)
+        self._cpu.set_czn_bits(op & 0x01, result)
 
         return result
 
@@ -2283,8 +2221,7 @@ class ORA(Instruction):
         ac = self._cpu.get_reg_a()
         result = ac | op
 
-        self._cpu.set_sign_bit(result)
-        self._cpu.set_zero_bit(result)
+        self._cpu.set_zn_bits(result)
 
         self._cpu.set_reg_a(result)
 
@@ -2478,8 +2415,7 @@ class PLA(Instruction):
     def execute(self):
         a = self._cpu.pull_stack()
         self._cpu.set_reg_a(a)
-        self._cpu.set_sign_bit(a)
-        self._cpu.set_zero_bit(a)
+        self._cpu.set_zn_bits(a)
 
         # Incrementa el registro contador (PC) de la CPU
         self._cpu.incr_pc(self.BYTES)
@@ -2530,9 +2466,7 @@ class ROL(Instruction):
         if self._cpu.get_reg_p_c_bit():
             result = result | 0x01
 
-        self._cpu.set_carry_bit(result)
-        self._cpu.set_sign_bit(result)
-        self._cpu.set_zero_bit(result)
+        self._cpu.set_czn_bits(result >> 8, result)
 
         return result
 
@@ -2664,9 +2598,7 @@ class ROR(Instruction):
         if self._cpu.get_reg_p_c_bit():
             result = result | 0x80
 
-        self._cpu.set_reg_p_c_bit(op & 0x01)
-        self._cpu.set_sign_bit(result)
-        self._cpu.set_zero_bit(result)
+        self._cpu.set_czn_bits(op & 0x01, result)
 
         return result
 
@@ -2846,23 +2778,8 @@ class SBC(Instruction):
 
         rst = ac - op - 1 + carry
 
-        # Establece el bit CARRY del registro P
-        if 0 <= rst < 0x100:
-            self._cpu.set_reg_p_c_bit(1)
-        else:
-            self._cpu.set_reg_p_c_bit(0)
-
-        # Establece el bit ZERO del registro P
-        self._cpu.set_zero_bit(rst)
-
-        # Establece el bit OVERFLOW del registro P
-        if (((ac ^ op) & 0x80) and ((ac ^ rst) & 0x80)):
-            self._cpu.set_reg_p_v_bit(1)
-        else:
-            self._cpu.set_reg_p_v_bit(0)
-
-        # Establece el bit SIGN del registro P
-        self._cpu.set_sign_bit(rst)
+        # Establece los bits CARRY, ZERO, OVERFLOW y SIGN del registro P
+        self._cpu.set_sbc_bits(ac, op, carry)
 
         self._cpu.set_reg_a(rst)
 
@@ -3335,8 +3252,7 @@ class TAX(Instruction):
     def execute(self):
         ac = self._cpu.get_reg_a()
 
-        self._cpu.set_zero_bit(ac)
-        self._cpu.set_sign_bit(ac)
+        self._cpu.set_zn_bits(ac)
 
         self._cpu.set_reg_x(ac)
 
@@ -3363,8 +3279,7 @@ class TAY(Instruction):
     def execute(self):
         ac = self._cpu.get_reg_a()
 
-        self._cpu.set_zero_bit(ac)
-        self._cpu.set_sign_bit(ac)
+        self._cpu.set_zn_bits(ac)
 
         self._cpu.set_reg_y(ac)
 
@@ -3391,8 +3306,7 @@ class TSX(Instruction):
     def execute(self):
         sp = self._cpu.get_reg_sp()
 
-        self._cpu.set_zero_bit(sp)
-        self._cpu.set_sign_bit(sp)
+        self._cpu.set_zn_bits(sp)
 
         self._cpu.set_reg_x(sp)
 
@@ -3419,8 +3333,7 @@ class TXA(Instruction):
     def execute(self):
         reg_x = self._cpu.get_reg_x()
 
-        self._cpu.set_zero_bit(reg_x)
-        self._cpu.set_sign_bit(reg_x)
+        self._cpu.set_zn_bits(reg_x)
 
         self._cpu.set_reg_a(reg_x)
 
@@ -3472,8 +3385,7 @@ class TYA(Instruction):
     def execute(self):
         reg_y = self._cpu.get_reg_y()
 
-        self._cpu.set_zero_bit(reg_y)
-        self._cpu.set_sign_bit(reg_y)
+        self._cpu.set_zn_bits(reg_y)
 
         self._cpu.set_reg_a(reg_y)
 
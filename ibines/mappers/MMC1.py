@@ -7,6 +7,10 @@ class MMC1(Mapper):
 
     MAPPER_CODE = 1
 
+    # Campos del estado guardado con save_state
+    STATE_FIELDS = [("_shift_reg", "B"), ("_reg0", "B"), ("_reg1", "B"), ("_reg2", "B"), ("_reg3", "B"),
+                    ("_addr_13_14", "H"), ("_counter", "B"), ("_prg_bank_0", "B"), ("_prg_bank_1", "B")]
+
     def __init__(self, rom):
         super(MMC1, self).__init__(rom)
 
@@ -22,57 +26,16 @@ class MMC1(Mapper):
         self._addr_13_14 = 0x0000
         self._counter = 0
 
-        # Memoria CHR RAM (si la tuviera. Sólo en caso que los bancos CHR-ROM sean 0)
-        self._chr_ram_0 = [0x00] * 4096
-        self._chr_ram_1 = [0x00] * 4096
-
-        # Bancos de memoria
-
-        # Bancos de CHR de 4K
-        self._chr_0 = None         # 0x0000
-        self._chr_1 = None         # 0x1000
-
-        # Bancos de PGR de 16K
-        self._prg_0 = None        # 0x8000
-        self._prg_1 = None        # 0xC000
-
-        # Se carga el estado inicial
-        self._prg_0 = self._rom.get_prg(0)
-        self._prg_1 = self._rom.get_prg(self._rom.get_prg_count() - 1)
-
-
-    def read_chr(self, addr):
-        a = addr % 0x4000
-        d = 0x00
-
-        if 0x0000 <= a <= 0x0FFF:
-            d = self._chr_0[a]
-        elif 0x1000 <= a <= 0x1FFF:
-            d = self._chr_1[a - 0x1000]
-
-        return d
-
-
-    def read_prg(self, addr):
-        d = 0x00
-
-        if 0x8000 <= addr <= 0xBFFF:
-            d = self._prg_0[addr - 0x8000]
-        elif 0xC000 <= addr <= 0xFFFF:
-            d = self._prg_1[addr - 0xC000]
-
-        return d
+        # Números de los bancos PRG de 16K cargados
+        self._prg_bank_0 = 0
+        self._prg_bank_1 = self._rom.get_prg_count() - 1
 
 
+    # Si no hay CHR-ROM la memoria CHR es RAM (self._chr_data) y se escribe a través de
+    # los bancos de 1KB seleccionados, igual que se lee
     def write_chr(self, data, addr):
         if self._rom.get_chr_count() == 0:
-            a = addr % 0x4000
-            d = data & 0xFF
-
-            if 0x0000 <= a <= 0x0FFF:
-                self._chr_0[a] = d
-            elif 0x1000 <= a <= 0x1FFF:
-                self._chr_1[a - 0x1000] = d
+            self._chr_data[(self._chr_banks[addr >> 10] << 10) + (addr & 0x03FF)] = data & 0xFF
 
 
     # Escribe en los registros. 1 bit cada vez ya que es una linea serie
@@ -114,6 +77,11 @@ class MMC1(Mapper):
                 self._counter += 1
 
 
+    def map_prg(self):
+        self._map_prg_bank(0x8000, self._prg_bank_0 * 0x4000, 0x4000)
+        self._map_prg_bank(0xC000, self._prg_bank_1 * 0x4000, 0x4000)
+
+
     def mirror_mode(self):
         # Si el bit 1 del registro 0 es 0 se activa single mirroring (valor 2)
         if self._reg0 & 0x02 == 0:
@@ -122,6 +90,24 @@ class MMC1(Mapper):
         else:
             return (~self._reg0) & 0x01
 
+    # El estado incluye la CHR-RAM si la hay
+    def get_state(self):
+        state = super(MMC1, self).get_state()
+        if self._rom.get_chr_count() == 0:
+            state += str(self._chr_data)
+
+        return state
+
+
+    def set_state(self, data):
+        offset = super(MMC1, self).set_state(data)
+        if self._rom.get_chr_count() == 0:
+            self._chr_data[:] = data[offset:offset + 0x2000]
+            offset += 0x2000
+
+        return offset
+
+
     def get_reg0(self):
         return self._reg0
 
@@ -147,28 +133,26 @@ class MMC1(Mapper):
         if chr_size == 0:
             # Si tiene CHR-RAM se intercambia la RAM
             if self._rom.get_chr_count() == 0:
-                self._chr_0 = self._chr_ram_0
-                self._chr_1 = self._chr_ram_1
+                self._map_chr_bank(0x0000, 0, 8)
             # Si no se intercambia la ROM
             else:
-                self._chr_0 = self._rom.get_chr(bank_number_0000 >> 1)[0x0000:0x1000]
-                self._chr_1 = self._rom.get_chr(bank_number_0000 >> 1)[0x1000:0x2000]
+                self._map_chr_bank(0x0000, (bank_number_0000 >> 1) * 8, 8)
         # Bancos de 4k
         elif chr_size == 1:
             # Si son bancos de RAM
             if self._rom.get_chr_count() == 0:
                 if bank_number_0000 == 0:
-                    self._chr_0 = self._chr_ram_0
+                    self._map_chr_bank(0x0000, 0, 4)
                 elif bank_number_0000 == 1:
-                    self._chr_0 = self._chr_ram_1
+                    self._map_chr_bank(0x0000, 4, 4)
 
                 if bank_number_1000 == 0:
-                    self._chr_1 = self._chr_ram_0
+                    self._map_chr_bank(0x1000, 0, 4)
                 elif bank_number_1000 == 1:
-                    self._chr_1 = self._chr_ram_1
+                    self._map_chr_bank(0x1000, 4, 4)
             else:
-                self._chr_0 = self._rom.get_chr_4k(bank_number_0000)
-                self._chr_1 = self._rom.get_chr_4k(bank_number_1000)
+                self._map_chr_bank(0x0000, bank_number_0000 * 4, 4)
+                self._map_chr_bank(0x1000, bank_number_1000 * 4, 4)
 
 
         # Intercambio de bancos PRG
@@ -181,13 +165,15 @@ class MMC1(Mapper):
             bank_number_16k_0 = bank_number
             bank_number_16k_1 = bank_number + 1
 
-            self._prg_0 = self._rom.get_prg(bank_number_16k_0)
-            self._prg_1 = self._rom.get_prg(bank_number_16k_1)
+            self._prg_bank_0 = bank_number_16k_0
+            self._prg_bank_1 = bank_number_16k_1
         # Si el tamaño del banco es de 16k
         elif prg_size == 1:
             # Se intercambia el banco 0xC000
             if prg_swap == 0:
-                self._prg_1 = self._rom.get_prg(bank_number)
+                self._prg_bank_1 = bank_number
             # Se intercambia el banco 0x8000
             elif prg_swap == 0:
-                self._prg_0 = self._rom.get_prg(bank_number)
+                self._prg_bank_0 = bank_number
+
+        self.map_prg()
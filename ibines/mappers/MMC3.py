@@ -8,28 +8,19 @@ class MMC3(Mapper):
 
     MAPPER_CODE = 4
 
+    # Campos del estado guardado con save_state
+    STATE_FIELDS = [("_mirror_mode", "B"), ("_save_ram", "B"),
+                    ("_bank_select", "B"), ("_bank_mode", "B"), ("_bank_inversion", "B"),
+                    ("_r0", "B"), ("_r1", "B"), ("_r2", "B"), ("_r3", "B"),
+                    ("_r4", "B"), ("_r5", "B"), ("_r6", "B"), ("_r7", "B"),
+                    ("_irq_enable", "B"), ("_irq_reload_flag", "B"), ("_irq_latch", "B"), ("_irq_counter", "B")]
+
     def __init__(self, rom):
         super(MMC3, self).__init__(rom)
 
         # CPU
         self._cpu = None
 
-        # Bancos prg de 8k
-        self._prg_rom_0 = [0x00] * 8192
-        self._prg_rom_1 = [0x00] * 8192
-        self._prg_rom_2 = [0x00] * 8192
-        self._prg_rom_3 = [0x00] * 8192
-
-        # Bancos chr de 1k
-        self._chr_rom_0 = self._rom.get_chr_1k(0)
-        self._chr_rom_1 = self._rom.get_chr_1k(1)
-        self._chr_rom_2 = self._rom.get_chr_1k(2)
-        self._chr_rom_3 = self._rom.get_chr_1k(3)
-        self._chr_rom_4 = self._rom.get_chr_1k(4)
-        self._chr_rom_5 = self._rom.get_chr_1k(5)
-        self._chr_rom_6 = self._rom.get_chr_1k(6)
-        self._chr_rom_7 = self._rom.get_chr_1k(7)
-
         # Modo mirror
         self._mirror_mode = 0
 
@@ -47,9 +38,6 @@ class MMC3(Mapper):
 
         self._prg_count_8k = self._rom.get_prg_count() * 2
 
-        # Iniciamos el banco correspondiente a las posiciones 0xE000-0xFFFF que es fijo siempre
-        self._prg_rom_3 = self._rom.get_prg_8k(self._prg_count_8k - 1)
-
         # Registros de datos
         self._r0 = 0
         self._r1 = 0
@@ -71,55 +59,31 @@ class MMC3(Mapper):
         return self._mirror_mode
 
 
-    def set_cpu(self, cpu):
-        self._cpu = cpu
-
-
-    def read_prg(self, addr):
-        data = 0x0
-        a = addr & 0x1FFF
-
-        if 0x8000 <= addr <= 0x9FFF:
-            data = self._prg_rom_0[a]
-        elif 0xA000 <= addr <= 0xBFFF:
-            data = self._prg_rom_1[a]
-        elif 0xC000 <= addr <= 0xDFFF:
-            data = self._prg_rom_2[a]
-        elif 0xE000 <= addr <= 0xFFFF:
-            data = self._prg_rom_3[a]
-
-        return data
-
+    def map_prg(self):
+        if self._bank_mode == 0:
+            bank_8000 = self._r6
+            bank_c000 = self._prg_count_8k - 2
+        else:
+            bank_8000 = self._prg_count_8k - 2
+            bank_c000 = self._r6
 
-    def read_chr(self, addr):
-        data = 0x0
-        a = addr & 0x03FF
+        self._map_prg_bank(0x8000, bank_8000 * 0x2000, 0x2000)
+        self._map_prg_bank(0xA000, self._r7 * 0x2000, 0x2000)
+        self._map_prg_bank(0xC000, bank_c000 * 0x2000, 0x2000)
+        self._map_prg_bank(0xE000, (self._prg_count_8k - 1) * 0x2000, 0x2000)
 
-        if 0x0000 <= addr <= 0x03FF:
-            data = self._chr_rom_0[a]
-        elif 0x0400 <= addr <= 0x07FF:
-            data = self._chr_rom_1[a]
-        elif 0x0800 <= addr <= 0x0BFF:
-            data = self._chr_rom_2[a]
-        elif 0x0C00 <= addr <= 0x0FFF:
-            data = self._chr_rom_3[a]
-        elif 0x1000 <= addr <= 0x13FF:
-            data = self._chr_rom_4[a]
-        elif 0x1400 <= addr <= 0x17FF:
-            data = self._chr_rom_5[a]
-        elif 0x1800 <= addr <= 0x1BFF:
-            data = self._chr_rom_6[a]
-        elif 0x1C00 <= addr <= 0x1FFF:
-            data = self._chr_rom_7[a]
 
-        return data
+    def set_cpu(self, cpu):
+        self._cpu = cpu
 
 
+    # Sólo las escrituras en 0x8000-0x9FFF cambian los bancos
     def write_prg(self, data, addr):
         if (not addr & 0x01) and (0x8000 <= addr < 0xA000):
             self._bank_select = data & 0x07
             self._bank_mode = (data & 0x40) >> 6
             self._bank_inversion = (data & 0x80) >> 7
+            self._swap_banks()
         elif (addr & 0x01) and (0x8000 <= addr < 0xA000):
             if self._bank_select == 0:
                 self._r0 = data
@@ -137,6 +101,7 @@ class MMC3(Mapper):
                 self._r6 = data
             elif self._bank_select == 7:
                 self._r7 = data
+            self._swap_banks()
         elif (not addr & 0x01) and (0xA000 <= addr < 0xC000):
             self._mirror_mode = (~data) & 0x01
         elif (addr & 0x01) and (0xA000 <= addr < 0xC000):
@@ -151,50 +116,33 @@ class MMC3(Mapper):
         elif (addr & 0x01) and (0xE000 <= addr <= 0xFFFF):
             self._irq_enable = 1
 
-        self._swap_banks()
-
 
+    # Los bancos CHR y PRG son posiciones en el buffer de la ROM, así que cambiar de
+    # banco no copia nada: sólo se actualizan los números de banco
     def _swap_banks(self):
         # Bancos CHR
+        chr_banks = self._chr_banks
         if self._bank_inversion == 0:
-            self._chr_rom_0 = self._rom.get_chr_1k(self._r0 & 0xFE)
-            self._chr_rom_1 = self._rom.get_chr_1k(self._r0 | 0x01)
-
-            self._chr_rom_2 = self._rom.get_chr_1k(self._r1 & 0xFE)
-            self._chr_rom_3 = self._rom.get_chr_1k(self._r1 | 0x01)
-
-            self._chr_rom_4 = self._rom.get_chr_1k(self._r2)
-
-            self._chr_rom_5 = self._rom.get_chr_1k(self._r3)
-
-            self._chr_rom_6 = self._rom.get_chr_1k(self._r4)
-
-            self._chr_rom_7 = self._rom.get_chr_1k(self._r5)
+            chr_banks[0] = self._r0 & 0xFE
+            chr_banks[1] = self._r0 | 0x01
+            chr_banks[2] = self._r1 & 0xFE
+            chr_banks[3] = self._r1 | 0x01
+            chr_banks[4] = self._r2
+            chr_banks[5] = self._r3
+            chr_banks[6] = self._r4
+            chr_banks[7] = self._r5
         else:
-            self._chr_rom_4 = self._rom.get_chr_1k(self._r0 & 0xFE)
-            self._chr_rom_5 = self._rom.get_chr_1k(self._r0 | 0x01)
-
-            self._chr_rom_6 = self._rom.get_chr_1k(self._r1 & 0xFE)
-            self._chr_rom_7 = self._rom.get_chr_1k(self._r1 | 0x01)
-
-            self._chr_rom_0 = self._rom.get_chr_1k(self._r2)
-
-            self._chr_rom_1 = self._rom.get_chr_1k(self._r3)
-
-            self._chr_rom_2 = self._rom.get_chr_1k(self._r4)
-
-            self._chr_rom_3 = self._rom.get_chr_1k(self._r5)
-
+            chr_banks[0] = self._r2
+            chr_banks[1] = self._r3
+            chr_banks[2] = self._r4
+            chr_banks[3] = self._r5
+            chr_banks[4] = self._r0 & 0xFE
+            chr_banks[5] = self._r0 | 0x01
+            chr_banks[6] = self._r1 & 0xFE
+            chr_banks[7] = self._r1 | 0x01
 
         # Bancos PRG
-        if self._bank_mode == 0:
-            self._prg_rom_0 = self._rom.get_prg_8k(self._r6)
-            self._prg_rom_2 = self._rom.get_prg_8k(self._prg_count_8k - 2)
-        elif self._bank_mode == 1:
-            self._prg_rom_0 = self._rom.get_prg_8k(self._prg_count_8k - 2)
-            self._prg_rom_2 = self._rom.get_prg_8k(self._r6)
-
-        self._prg_rom_1 = self._rom.get_prg_8k(self._r7)
+        self.map_prg()
 
 
     def scanline_tick(self):
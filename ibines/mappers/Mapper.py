@@ -1,32 +1,105 @@
 # -*- coding: utf-8 -*-
 
+import nesutils
+
 
 class Mapper(object):
 
+    # Campos del estado guardado con save_state. Cada mapper añade sus registros
+    STATE_FIELDS = []
+
     def __init__(self, rom):
         super(Mapper, self).__init__()
 
         # Almacena la ROM del juego
         self._rom = rom
 
+        # Memoria de la CPU en cuya tabla de páginas se colocan los bancos PRG
+        self._mem = None
+
+        # Número del banco de 1KB de memoria CHR que se ve en cada 1KB de las pattern
+        # tables (0x0000-0x1FFF). Cada mapper la modifica en el sitio al cambiar de banco
+        self._chr_banks = range(8)
+
+        # Buffer del que se leen los bancos CHR y posición en él del banco 0. Con CHR-ROM
+        # es el buffer de la ROM, sin copias; si no hay CHR-ROM son 8KB de CHR-RAM, que
+        # sólo escriben los mappers que la soportan
+        if rom.get_chr_count() > 0:
+            self._chr_data = rom.get_data()
+            self._chr_start = rom.get_chr_address(0)
+        else:
+            self._chr_data = bytearray(0x2000)
+            self._chr_start = 0
+
+        # Posición en el buffer de la ROM del banco PRG de 8KB que se ve en 0x8000,
+        # 0xA000, 0xC000 y 0xE000. Se actualiza en _map_prg_bank
+        self._prg_data = rom.get_data()
+        self._prg_addresses = [0] * 4
+
+
+    # Lee un byte de las pattern tables a través de los bancos de 1KB seleccionados
     def read_chr(self, addr):
-        pass
+        return self._chr_data[self._chr_start + (self._chr_banks[addr >> 10] << 10) + (addr & 0x03FF)]
 
-    def write_chr(self, addr):
+    def write_chr(self, data, addr):
         pass
 
+
+    # Lee un byte de los bancos PRG seleccionados
     def read_prg(self, addr):
-        pass
+        return self._prg_data[self._prg_addresses[(addr >> 13) & 0x03] + (addr & 0x1FFF)]
 
     def write_prg(self, data, addr):
         pass
 
 
+    # Enlaza el mapper con la CPU. Lo usan los mappers que generan IRQ
+    def set_cpu(self, cpu):
+        pass
+
+
+    # Enlaza el mapper con la memoria de la CPU y coloca los bancos PRG iniciales
+    def set_memory(self, mem):
+        self._mem = mem
+        self.map_prg()
+
+
+    # Coloca en la tabla de páginas de la memoria los bancos PRG seleccionados.
+    # Cada mapper debe llamarlo cuando cambia de banco
+    def map_prg(self):
+        pass
+
+
+    # Coloca "size" bytes de la memoria PRG a partir de la posición "offset" en la dirección "addr"
+    def _map_prg_bank(self, addr, offset, size):
+        for n in xrange(size >> 13):
+            self._prg_addresses[((addr >> 13) & 0x03) + n] = self._rom.get_prg_address(offset + (n << 13))
+
+        if self._mem is not None:
+            self._mem.set_read_pages(addr, self._rom.get_prg_pages(offset, size))
+
+
     # 0x0: horizontal; 0x1: vertical: 0x2: single; 0x3: 4-screen
     def mirror_mode(self):
         pass
 
 
+    # Devuelve los bancos CHR de 1KB de las pattern tables
+    def get_chr_banks(self):
+        return self._chr_banks
+
+
+    # Devuelve el número de bancos CHR de 1KB distintos (los de CHR-RAM si no hay CHR-ROM)
+    def get_chr_bank_count(self):
+        return max(self._rom.get_chr_count(), 1) * 8
+
+
+    # Coloca el banco CHR de "size" KB que empieza en el banco de 1KB "bank" en la dirección "addr"
+    def _map_chr_bank(self, addr, bank, size):
+        first = addr >> 10
+        self._chr_banks[first:first + size] = range(bank, bank + size)
+
+
     def get_prg_count(self):
         return self._rom.get_prg_count()
 
@@ -40,6 +113,22 @@ class Mapper(object):
         pass
 
 
+    # Devuelve el estado del mapper en binario: los bancos CHR y los registros
+    def get_state(self):
+        return str(bytearray(self._chr_banks)) + nesutils.pack_fields(self, self.STATE_FIELDS)
+
+
+    # Restaura el estado devuelto por get_state y vuelve a colocar los bancos PRG.
+    # Devuelve la posición siguiente a los datos leídos
+    def set_state(self, data):
+        self._chr_banks[:] = list(bytearray(data[0:8]))
+        offset = nesutils.unpack_fields(self, self.STATE_FIELDS, data, 8)
+
+        self.map_prg()
+
+        return offset
+
+
 
 
 
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+import importlib
+
+"""
+MapperRegistry
+
+Descripción: Registro de los mappers soportados por número de mapper iNES. Cada
+número se asocia al módulo y a la clase que lo implementan, y el módulo sólo se
+importa la primera vez que se crea un mapper de ese número. Los módulos sin
+paquete se buscan dentro del paquete mappers. Se pueden añadir mappers con
+register_mapper sin modificar la NES
+"""
+
+# Número de mapper iNES -> (módulo, clase)
+_MAPPERS = {
+    0: ("NROM", "NROM"),
+    1: ("MMC1", "MMC1"),
+    3: ("CNROM", "CNROM"),
+    4: ("MMC3", "MMC3"),
+}
+
+# Clases ya importadas por número de mapper
+_classes = {}
+
+# Paquete en el que se buscan los módulos sin paquete
+_PACKAGE = __name__.rpartition(".")[0]
+
+
+# Excepción que se lanza al crear un mapper cuyo número no está registrado
+class UnsupportedMapperError(Exception):
+
+    def __init__(self, code):
+        self._code = code
+
+    def get_code(self):
+        return self._code
+
+    def __str__(self):
+        return "Mapper %d no soportado. Mappers soportados: %s" % (
+            self._code, ", ".join(str(code) for code in get_supported_mappers()))
+
+
+# Registra (o sustituye) el mapper "code" implementado por la clase "class_name" del
+# módulo "module_name". El módulo no se importa hasta que se usa
+def register_mapper(code, module_name, class_name):
+    _MAPPERS[code] = (module_name, class_name)
+    _classes.pop(code, None)
+
+
+# Devuelve los números de mapper registrados
+def get_supported_mappers():
+    return sorted(_MAPPERS)
+
+
+# Indica si el mapper "code" está registrado
+def is_supported(code):
+    return code in _MAPPERS
+
+
+# Devuelve la clase del mapper "code", importando su módulo si hace falta
+def get_mapper_class(code):
+    cls = _classes.get(code)
+    if cls is None:
+        if code not in _MAPPERS:
+            raise UnsupportedMapperError(code)
+
+        module_name, class_name = _MAPPERS[code]
+        if "." not in module_name and _PACKAGE:
+            module_name = _PACKAGE + "." + module_name
+
+        cls = _classes[code] = getattr(importlib.import_module(module_name), class_name)
+
+    return cls
+
+
+# Crea el mapper de la ROM "rom"
+def create_mapper(rom):
+    return get_mapper_class(rom.get_mapper_code())(rom)
@@ -6,6 +6,9 @@
 # Módulo con distintas funciones útiles
 ###############################################################################
 
+import struct
+
+
 # Devuelve el valor del bit indicado por "bit_number" de la palabra
 # especificada por "word"
 def get_bit(word, bit_number):
@@ -45,3 +48,37 @@ def int_to_c2(n):
 
     return c2
 
+
+# Empaqueta en binario los atributos del objeto "obj" indicados en "fields", una
+# lista de tuplas (atributo, formato de struct)
+def pack_fields(obj, fields):
+    fmt = "<" + "".join(f for (name, f) in fields)
+    return struct.pack(fmt, *[getattr(obj, name) for (name, f) in fields])
+
+
+# Restaura en el objeto "obj" los atributos de "fields" desde "data" a partir de la
+# posición "offset". Devuelve la posición siguiente a los datos leídos
+def unpack_fields(obj, fields, data, offset=0):
+    fmt = "<" + "".join(f for (name, f) in fields)
+    values = struct.unpack_from(fmt, data, offset)
+    for (name, f), v in zip(fields, values):
+        setattr(obj, name, v)
+
+    return offset + struct.calcsize(fmt)
+
+
+# Une las cadenas binarias de "sections" precediendo cada una de su longitud
+def pack_sections(sections):
+    return "".join(struct.pack("<I", len(s)) + s for s in sections)
+
+
+# Separa las secciones de una cadena creada con pack_sections
+def unpack_sections(data):
+    sections = []
+    offset = 0
+    while offset < len(data):
+        size = struct.unpack_from("<I", data, offset)[0]
+        sections.append(data[offset + 4:offset + 4 + size])
+        offset += 4 + size
+
+    return sections
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+import numpy
+
+"""
+BackgroundRenderer
+
+Descripción: Dibuja el fondo de un scanline completo con NumPy en lugar de
+pixel a pixel. Los pixeles del scanline se obtienen indexando la tabla de tiles
+decodificados de TileCache. El resultado es un array de índices de la paleta de imagen
+(0-15) que se traduce a colores ARGB con una tabla de consulta de 16 entradas.
+"""
+class BackgroundRenderer(object):
+
+    def __init__(self, memory, tiles_cache, argb_palette):
+        #######################################################################
+        # Variables de instancia
+        #######################################################################
+        # Name tables tal y como las ve la PPU según el mirroring
+        self._name_tables = memory.get_name_tables()
+
+        # Paletas de imagen y sprites (0x3F00-0x3F1F) vistas como array de NumPy
+        self._palettes = numpy.frombuffer(memory.get_palettes(), dtype=numpy.uint8)
+
+        # Colores ARGB indexados por el número de color de la NES
+        self._argb_palette = numpy.array(argb_palette, dtype=numpy.uint32)
+
+        # Tiles decodificados
+        self._tiles_cache = tiles_cache
+
+        # Número de tile y color de atributo de los 33 tiles que toca un scanline
+        self._line_tiles = numpy.zeros(33, dtype=numpy.intp)
+        self._line_attrs = numpy.zeros((33, 1), dtype=numpy.uint8)
+        #######################################################################
+        #######################################################################
+
+
+    # Devuelve los índices de la paleta de imagen (0-15) de los 256 pixeles de un scanline.
+    # "vram_addr" es el registro de dirección de la PPU al inicio del scanline, "fine_x" el
+    # desplazamiento horizontal dentro del tile, "fine_y" la fila del tile y "pattern_table"
+    # la tabla de patrones del fondo
+    def render_scanline(self, vram_addr, fine_x, fine_y, pattern_table):
+        name_tables = self._name_tables
+        tiles_cache = self._tiles_cache
+        decoded = tiles_cache.get_decoded()
+        chr_banks = tiles_cache.get_chr_banks()
+        bank_base = pattern_table << 2
+        line_tiles = self._line_tiles
+        line_attrs = self._line_attrs
+
+        name_table = (vram_addr >> 10) & 0x03
+        coarse_x = vram_addr & 0x1F
+        coarse_y = (vram_addr >> 5) & 0x1F
+
+        # Dirección de la fila en la name table y de la fila de grupos en la attr table
+        row_addr = coarse_y << 5
+        attr_row_addr = 0x03C0 | ((coarse_y >> 2) << 3)
+        attr_shift_y = (coarse_y & 0x02) << 1
+
+        # Con desplazamiento fino se ve parte de un tile más
+        for n in xrange(33 if fine_x else 32):
+            table = name_tables[name_table]
+            index = table[row_addr | coarse_x]
+            tile = (chr_banks[bank_base | (index >> 6)] << 6) | (index & 0x3F)
+            if not decoded[tile]:
+                tiles_cache.decode(pattern_table, index)
+            line_tiles[n] = tile
+            line_attrs[n, 0] = ((table[attr_row_addr | (coarse_x >> 2)] >> (attr_shift_y | (coarse_x & 0x02))) & 0x03) << 2
+
+            # Al pasar del último tile se cambia a la name table horizontal contigua
+            coarse_x = (coarse_x + 1) & 0x1F
+            if coarse_x == 0:
+                name_table ^= 0x01
+
+        pixels = tiles_cache.get_tiles()[line_tiles, fine_y] | line_attrs
+
+        return pixels.reshape(264)[fine_x:fine_x + 256]
+
+
+    # Traduce índices de la paleta de imagen a colores ARGB con la paleta actual
+    def to_argb(self, indices):
+        lut = self._argb_palette[self._palettes[0:16] & 0x3F]
+        return lut[indices]
+
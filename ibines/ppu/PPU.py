@@ -2,7 +2,10 @@
 
 import nesutils
 import copy
+import numpy
 from PPUMemory import PPUMemory
+from BackgroundRenderer import BackgroundRenderer
+from TileCache import TileCache
 from SpriteMemory import SpriteMemory
 from GFX import *
 from Sprite import *
@@ -26,7 +29,16 @@ class PPU(object):
     FRAME_WIDTH = 256
     FRAME_HEIGHT = 240
 
-    def __init__(self, mapper):
+    # Campos del estado guardado con save_state
+    STATE_FIELDS = [("_cycles_frame", "I"), ("_end_frame", "B"), ("_end_scanline", "B"), ("_fetch_pattern", "B"),
+                    ("_scanline_number", "H"), ("_frame_count", "I"), ("_scanlines_pending", "H"),
+                    ("_sprite_hit", "B"), ("_int_vblank", "B"), ("_started_vblank", "B"), ("_vram_buffer", "B"),
+                    ("_reg_control_1", "B"), ("_reg_control_2", "B"), ("_reg_status", "B"),
+                    ("_reg_spr_addr", "B"), ("_reg_spr_io", "B"), ("_reg_vram_tmp", "H"), ("_reg_vram_addr", "H"),
+                    ("_reg_vram_io", "B"), ("_reg_sprite_dma", "B"), ("_reg_x_offset", "B"),
+                    ("_tmp_y_offset", "B"), ("_reg_vram_switch", "B"), ("_sprites_control_1", "B")]
+
+    def __init__(self, mapper, gfx=None):
         #######################################################################
         # Variables de instancia
         #######################################################################
@@ -34,11 +46,19 @@ class PPU(object):
         self._memory = PPUMemory(self, mapper)
         self._sprite_memory = SpriteMemory()
 
+        # Cache de Tiles decodificados, que se mantiene entre frames
+        self._tiles_cache = TileCache(self._memory, mapper)
+
+        # Dibuja el fondo de los scanlines completos
+        self._bg_renderer = BackgroundRenderer(self._memory, self._tiles_cache, PPU._ARGB_PALETTE)
+
         # Mapper
         self._mapper = mapper
 
-        # Motor gráfico del emulador
-        self._gfx = GFX_PySdl2()
+        # Motor gráfico del emulador. Si no se especifica uno se usa SDL con ventana
+        if gfx is None:
+            gfx = GFX_PySdl2()
+        self._gfx = gfx
 
         # Ciclos restantes hasta próximo frame
         self._cycles_frame = self.FRAME_CYCLES - 1
@@ -53,6 +73,14 @@ class PPU(object):
         # Scanline actual
         self._scanline_number = 0
 
+        # Número de frames completados
+        self._frame_count = 0
+
+        # Sólo se dibuja uno de cada "_frame_skip" frames. En los demás sólo se calcula lo
+        # que afecta a la emulación: el scroll, el sprite hit y los avisos al mapper
+        self._frame_skip = 1
+        self._render_frame = True
+
         # Número de scanlines pendientes
         self._scanlines_pending = 0
 
@@ -68,31 +96,35 @@ class PPU(object):
 
         self._sprite_zero = self._sprites_list[0]
 
+        # Registro de control 1 y paletas con los que se han cargado los sprites del frame. Se
+        # guardan para poder reconstruir los tiles de los sprites al restaurar el estado
+        self._sprites_control_1 = 0x00
+        self._sprites_palettes = bytearray(0x20)
+
         # Variables que almacenan el tile del sprite que se está procesando
         self._tile_sprite_zero_index_palette_0 = [None] * 8
         for x in range(8):
             self._tile_sprite_zero_index_palette_0[x] = [0] * 8
 
-        self._tile_sprite_zero_rgb_0 = [None] * 8
+        self._tile_sprite_zero_argb_0 = [None] * 8
         for x in range(8):
-            self._tile_sprite_zero_rgb_0[x] = [(0, 0, 0)] * 8
+            self._tile_sprite_zero_argb_0[x] = [0xFF000000] * 8
 
         self._tile_sprite_zero_index_palette_1 = [None] * 8
         for x in range(8):
             self._tile_sprite_zero_index_palette_1[x] = [0] * 8
 
-        self._tile_sprite_zero_rgb_1 = [None] * 8
+        self._tile_sprite_zero_argb_1 = [None] * 8
         for x in range(8):
-            self._tile_sprite_zero_rgb_1[x] = [(0, 0, 0)] * 8
+            self._tile_sprite_zero_argb_1[x] = [0xFF000000] * 8
 
 
         # Indica si ha avido ya un sprite hit en el frame
         self._sprite_hit = 0
 
-        # Indica si los píxeles son de background transparentes (0), de background sólidos (1) o de sprite (2)
-        self.pixel_background = [None] * 256
-        for x in range(256):
-            self.pixel_background[x] = [0] * 240
+        # Indica si los píxeles son de background transparentes (0), de background sólidos (1) o de sprite (2).
+        # Se indexa por [x, y]
+        self.pixel_background = numpy.zeros((256, 240), dtype=numpy.uint8)
 
         # Interrupciones
         self._int_vblank = 0
@@ -105,27 +137,14 @@ class PPU(object):
         # Buffer de lectura de la VRAM (la lectura del registro $2007 se entrega retrasada)
         self._vram_buffer = 0x00
 
-        # Variables que almacenan el tile del fondo que se está procesando
-        self._tile_bg_index_palette = [None] * 8
-        for x in range(8):
-            self._tile_bg_index_palette[x] = [0] * 8
-
-        self._tile_bg_rgb = [None] * 8
-        for x in range(8):
-            self._tile_bg_rgb[x] = [(0, 0, 0)] * 8
-
-
         # Variables que almacenan el tile del sprite que se está procesando
         self._tile_sprite_index_palette = [None] * 8
         for x in range(8):
             self._tile_sprite_index_palette[x] = [0] * 8
 
-        self._tile_sprite_rgb = [None] * 8
+        self._tile_sprite_argb = [None] * 8
         for x in range(8):
-            self._tile_sprite_rgb[x] = [(0, 0, 0)] * 8
-
-        # Cache de Tiles:
-        self._tiles_cache = {}
+            self._tile_sprite_argb[x] = [0xFF000000] * 8
 
         # Registros
 
@@ -183,25 +202,48 @@ class PPU(object):
             self._started_vblank = 0    # En el nuevo frame indicamos que no se ha procesado el período VBLANK aún
 
             # Dibujamos los sprites
-            if self.control_2_sprites_bit_4():
+            if self._render_frame and self.control_2_sprites_bit_4():
                 self.draw_sprites()
 
             if self.control_2_background_bit_3():
                 self._reg_vram_addr = self._reg_vram_tmp     # Esto es así al principio de cada frame
-                self._gfx.update()
-
-            #Reseteamos la cache de tiles al principio del frame:
-            self._tiles_cache = {}
+                if self._render_frame:
+                    self._gfx.update()
 
             # Cargamos los sprites para el siguiente frame
             self.get_sprites_list()
-            self._sprite_zero = self._sprites_list[0]
-            (self._tile_sprite_zero_index_palette_0, self._tile_sprite_zero_rgb_0), (self._tile_sprite_zero_index_palette_1, self._tile_sprite_zero_rgb_1) = self._sprite_zero.get_tiles()
 
             self._sprite_hit = 0
 
             # Indicamos que ha finalizado el frame
             self._end_frame = False
+            self._frame_count += 1
+            self._render_frame = self._frame_count % self._frame_skip == 0
+
+
+    # Devuelve el mínimo de ciclos de CPU que hay que pasar a exec_cycle para que
+    # ocurra el siguiente evento: fin de scanline (que es cuando se dibuja y se
+    # avisa al mapper), inicio del VBLANK o fin del frame. Con menos ciclos
+    # exec_cycle sólo descuenta el contador de ciclos del frame, por lo que se
+    # pueden acumular los de varias instrucciones en una sola llamada
+    def get_cycles_to_event(self):
+        cycles_frame = self._cycles_frame
+
+        # Fin del frame
+        cycles = cycles_frame + 1
+
+        # Fin del scanline actual
+        scanline = cycles_frame + (self._scanline_number + 1) * PPU.SCANLINE_CYCLES - PPU.FRAME_CYCLES
+        if scanline < cycles:
+            cycles = scanline
+
+        # Inicio del VBLANK
+        if not self._started_vblank:
+            vblank = cycles_frame - PPU.VBLANK_CYCLES + 1
+            if vblank < cycles:
+                cycles = vblank
+
+        return cycles
 
 
     # Lee el registro indicado por su dirección en memoria
@@ -560,6 +602,30 @@ class PPU(object):
         self._sprite_hit = v
         self._reg_status = nesutils.set_bit(self._reg_status, 6, v)
 
+    # Devuelve el número de frames completados
+    def get_frame_count(self):
+        return self._frame_count
+
+    # Dibuja sólo uno de cada "n" frames (con 1 se dibujan todos). Se aplica ya al
+    # frame actual, por lo que conviene cambiarlo entre frames
+    def set_frame_skip(self, n):
+        if n < 1:
+            raise ValueError("El número de frames debe ser al menos 1")
+
+        self._frame_skip = n
+        self._render_frame = self._frame_count % n == 0
+
+    def get_frame_skip(self):
+        return self._frame_skip
+
+    # Devuelve el número de scanlines completados desde el inicio
+    def get_scanline_count(self):
+        return self._frame_count * PPU.FRAME_SCANLINES + self._scanline_number
+
+    # Devuelve el motor gráfico
+    def get_gfx(self):
+        return self._gfx
+
     # Indica si nos encontramos en un periodo VBLANK
     def is_vblank(self):
         return self._scanline_number > 240
@@ -576,19 +642,22 @@ class PPU(object):
             # del scanline
             self._reg_vram_addr = (self._reg_vram_addr & 0b1111101111100000) | (tmp & 0x41F)
 
-            # Pintamos el pixel
-            x = 0
-            while x < 256:
-                self.draw_pixel(x, y)
-
-                # Incrementamos el registro de dirección horizontalmente si estamos pintando el background
-                self.incr_xscroll()
-
-                # Si hemos dibujado el último pixel en anchura del "pattern", indicamos que hay que usar otro
-                if self._reg_x_offset == 0:
-                    self._fetch_pattern = True
-
-                x += 1
+            # Pintamos el fondo del scanline completo. En los frames que no se dibujan sólo
+            # hace falta saber qué píxeles del fondo son sólidos en los scanlines en los
+            # que puede haber sprite hit
+            if self._render_frame:
+                indices = self._bg_renderer.render_scanline(self._reg_vram_addr, self._reg_x_offset, self._tmp_y_offset,
+                                                            self.control_1_background_pattern_bit_4())
+                self.pixel_background[:, y] = (indices & 0x03) != 0
+                self._gfx.draw_line(y, self._bg_renderer.to_argb(indices))
+            elif not self._sprite_hit and self._sprite_zero.is_in_scanline(self._scanline_number, self.control_1_sprites_size_bit_5()):
+                indices = self._bg_renderer.render_scanline(self._reg_vram_addr, self._reg_x_offset, self._tmp_y_offset,
+                                                            self.control_1_background_pattern_bit_4())
+                self.pixel_background[:, y] = (indices & 0x03) != 0
+
+            # Tras los 256 pixeles el scroll horizontal ha dado una vuelta completa a las
+            # 32 columnas de tiles, así que sólo cambia la name table horizontal
+            self._reg_vram_addr ^= 0x0400
 
             # Incrementamos el registro de dirección verticalmente si estamos pintando el background
             self.incr_yscroll()
@@ -602,42 +671,6 @@ class PPU(object):
         self._fetch_pattern = True
 
 
-    # Dibuja un pixel de la pantalla
-    def draw_pixel(self, x, y):
-        self.pixel_background[x][y] = 0
-
-        # Dibuja el fondo
-        pattern_pixel_x = self._reg_x_offset
-        pattern_pixel_y = self._tmp_y_offset
-
-        # Calcula la dirección en la Name Table activa
-        name_table_addr = 0x2000 + (self._reg_vram_addr & 0x0FFF)
-
-        if self._fetch_pattern:
-            pattern_table_number = self.control_1_background_pattern_bit_4()
-            pattern_index = self._memory.read_data(name_table_addr)
-
-            attr_color = self.calc_attr_color(name_table_addr)
-
-            if (pattern_table_number, pattern_index, attr_color) in self._tiles_cache:
-                self._tile_bg_index_palette, self._tile_bg_rgb = self._tiles_cache[pattern_table_number, pattern_index, attr_color]
-            else:
-                self._tile_bg_index_palette, self._tile_bg_rgb = self.fetch_pattern(pattern_table_number, pattern_index, attr_color, PPUMemory.ADDR_IMAGE_PALETTE)
-                self._tiles_cache[(pattern_table_number, pattern_index, attr_color)] = (self._tile_bg_index_palette, self._tile_bg_rgb)
-
-
-            self._fetch_pattern = False
-
-        # Desactivado el clipping por cuestiones de rendimiento
-        #if self.control_2_clip_background_bit_1() or x >= 8:
-
-        # Comprueba si el pixel actual es de background
-        if self._tile_bg_index_palette[pattern_pixel_x][pattern_pixel_y] & 0x03:
-            self.pixel_background[x][y] = 1
-
-        self._gfx.draw_pixel(x, y, self._tile_bg_rgb[pattern_pixel_x][pattern_pixel_y])
-
-
     # Dibuja todos los sprites de la lista de sprites
     def draw_sprites(self):
         size_bit = self.control_1_sprites_size_bit_5()
@@ -666,11 +699,11 @@ class PPU(object):
         screen_y = off_y + spr_y
 
         if screen_x < 256 and screen_y < 240:
-            pixel_background = self.pixel_background[screen_x][screen_y]
+            pixel_background = self.pixel_background[screen_x, screen_y]
             # Si los sprites son 8x8
             if size_bit == 0:
                 # Obtenemos el tile
-                self._tile_sprite_index_palette, self._tile_sprite_rgb = sprite.get_tiles()[0]
+                self._tile_sprite_index_palette, self._tile_sprite_argb = sprite.get_tiles()[0]
 
                 # Si está activado el flag de invertir horizontalmente
                 if sprite.get_horizontal_flip():
@@ -685,9 +718,9 @@ class PPU(object):
 
                 # Obtenemos los tiles
                 if spr_y < 8:
-                    self._tile_sprite_index_palette, self._tile_sprite_rgb = sprite.get_tiles()[vertical_flip]
+                    self._tile_sprite_index_palette, self._tile_sprite_argb = sprite.get_tiles()[vertical_flip]
                 else:
-                    self._tile_sprite_index_palette, self._tile_sprite_rgb = sprite.get_tiles()[not vertical_flip]
+                    self._tile_sprite_index_palette, self._tile_sprite_argb = sprite.get_tiles()[not vertical_flip]
                     spr_y = spr_y & 0x07
 
                 # Si está activado el flag de invertir horizontalmente
@@ -703,21 +736,32 @@ class PPU(object):
             if not transparent:
                 # Pinta el pixel si tiene prioridad sobre las nametables, o en caso contrario si el color de fondo es transparente
                 if (pixel_background != 2) and (sprite.get_priority() == 0 or not pixel_background):
-                    self._gfx.draw_pixel(screen_x, screen_y, self._tile_sprite_rgb[spr_x][spr_y])
+                    self._gfx.draw_pixel(screen_x, screen_y, self._tile_sprite_argb[spr_x][spr_y])
 
-                self.pixel_background[screen_x][screen_y] = 2
+                self.pixel_background[screen_x, screen_y] = 2
 
 
     # Devuelve una lista de objetos de clase Sprite con los sprites de la memoria de sprites
     def get_sprites_list(self):
+        self._sprites_control_1 = self._reg_control_1
+        self._sprites_palettes[:] = self._memory.get_palettes()
+
+        self._load_sprites(self._sprite_memory)
+
+
+    # Carga la lista de sprites y los tiles del sprite zero desde la memoria de sprites "sprite_memory"
+    def _load_sprites(self, sprite_memory):
         n = 0
         addr = 0x00
 
         while n < 64:
-            self._sprites_list[n].load_by_addr(self._sprite_memory, addr)
+            self._sprites_list[n].load_by_addr(sprite_memory, addr)
             addr += 0x04
             n += 1
 
+        self._sprite_zero = self._sprites_list[0]
+        (self._tile_sprite_zero_index_palette_0, self._tile_sprite_zero_argb_0), (self._tile_sprite_zero_index_palette_1, self._tile_sprite_zero_argb_1) = self._sprite_zero.get_tiles()
+
 
     def _calc_sprite_hit(self):
         sprites_size_bit = self.control_1_sprites_size_bit_5()
@@ -727,14 +771,14 @@ class PPU(object):
             spr_y = y - self._sprite_zero.get_offset_y()
 
             # Obtiene el tile del Sprite y su posición vertical
-            tile_sprite_zero_index_palette, tile_sprite_zero_rgb = self._sprite_zero.get_tiles()[sprites_size_bit]
+            tile_sprite_zero_index_palette, tile_sprite_zero_argb = self._sprite_zero.get_tiles()[sprites_size_bit]
             spr_y = spr_y & 0x07
 
             # Calcula si hay alguna colisión
             for spr_x in range(8):
                 screen_x = offset_x + spr_x
                 if screen_x < 255:
-                    if (tile_sprite_zero_index_palette[spr_x][spr_y] & 0x03 != 0) and (self.pixel_background[screen_x][y] == 1):
+                    if (tile_sprite_zero_index_palette[spr_x][spr_y] & 0x03 != 0) and (self.pixel_background[screen_x, y] == 1):
                         self.set_sprite_hit(1)
 
 
@@ -773,52 +817,94 @@ class PPU(object):
 
     # Lee el patrón "pattern_index" de la tabla de patrones "pattern_table" con el color "attr_color" y la paleta
     # de colores ubicada en la dirección de memoria "palette_addr" y lo coloca en las variables de salida
-    # "tile_palette_index" y "tile_rgb"
+    # "tile_palette_index" y "tile_argb"
     def fetch_pattern(self, pattern_table, pattern_index, attr_color, palette_addr):
-        tile_palette_index = [None] * 8
-        for x in xrange(8):
-            tile_palette_index[x] = [0] * 8
+        # El tile decodificado sale de la cache y sólo se le aplica la paleta
+        columns = self._tiles_cache.get_columns(pattern_table, pattern_index)
 
-        tile_rgb = [None] * 8
-        for x in xrange(8):
-            tile_rgb[x] = [(0, 0, 0)] * 8
+        attr = (attr_color & 0x03) << 2
+        tile_palette_index = [[v | attr for v in column] for column in columns]
+
+        # Colores de las 16 entradas de la paleta
+        palette = self._memory.get_palettes()
+        base = palette_addr & 0x1F
+        colors = [PPU._ARGB_PALETTE[c & 0x3F] for c in palette[base:base + 16]]
+        tile_argb = [[colors[v] for v in column] for column in tile_palette_index]
+
+        return (tile_palette_index, tile_argb)
 
-        if pattern_table == 0:
-            addr = 0x0000
-        else:
-            addr = 0x1000
 
-        addr = addr + pattern_index * 16
+    # Devuelve el color ARGB del número de color "index" de la NES
+    def get_color(self, index):
+        return PPU._ARGB_PALETTE[index & 0x3F]
 
-        y = 0
-        # Lee los bytes del patrón de memoria y lo guarda en una lista
-        for a in xrange(addr, addr + 8):
-            byte_1 = self._memory.read_data(a)
-            byte_2 = self._memory.read_data(a + 8)
 
-            for x in xrange(8):
-                # Calcula la dirección del color en la paleta de memoria y lo extrae de la tabla de colores
-                palette_index = (0x00 | ((byte_1 & (0x01 << x)) >> x) | (((byte_2 & (0x01 << x)) >> x) << 1) | ((attr_color & 0x03) << 2))
+    # Borra la cache de Tiles
+    def reset_tiles_cache(self):
+        self._tiles_cache.reset()
 
-                # Asigna el índice de la paleta a la posición correspondiente:
-                tile_palette_index[7 - x][y] = palette_index
 
-                color_index = self._memory.read_data(palette_addr + palette_index) & 0x3F
-                rgb = self.get_color(color_index)
-                tile_rgb[7 - x][y] = rgb
+    # Comparte los tiles decodificados de la PPU "ppu", de otra instancia con la misma ROM,
+    # si ésta tiene CHR-ROM
+    def share_tiles_cache(self, ppu):
+        if self._mapper.get_chr_count() > 0:
+            self._tiles_cache.share(ppu._tiles_cache)
 
-            y = (y + 1) & 0x07
 
-        return (tile_palette_index, tile_rgb)
+    # Invalida el tile de la dirección "addr" de las pattern tables tras un cambio en CHR-RAM
+    def invalidate_tile(self, addr):
+        self._tiles_cache.invalidate(addr)
 
 
-    def get_color(self, index):
-        return PPU._COLOR_PALETTE[index & 0x3F]
+    # Actualiza el mirroring de las name tables tras un posible cambio en el mapper
+    def update_mirroring(self):
+        self._memory.update_mirroring()
 
 
-    # Borra la cache de Tiles
-    def reset_tiles_cache(self):
-        self._tiles_cache = {}
+    # Devuelve el estado de la PPU en binario: registros, memorias, los sprites cargados
+    # para el frame y el tipo de pixel de fondo. La imagen del motor gráfico no se guarda
+    def get_state(self):
+        sprites = bytearray()
+        for sprite in self._sprites_list:
+            sprites.extend(sprite.get_data())
+
+        return nesutils.pack_sections([nesutils.pack_fields(self, PPU.STATE_FIELDS),
+                                       self._memory.get_state(),
+                                       self._sprite_memory.get_state(),
+                                       str(sprites),
+                                       str(self._sprites_palettes),
+                                       self.pixel_background.tostring()])
+
+
+    # Restaura el estado devuelto por get_state. El mapper tiene que estar ya restaurado
+    def set_state(self, data):
+        fields, memory, sprite_memory, sprites, sprites_palettes, pixel_background = nesutils.unpack_sections(data)
+
+        nesutils.unpack_fields(self, PPU.STATE_FIELDS, fields)
+        self._render_frame = self._frame_count % self._frame_skip == 0
+        self._memory.set_state(memory)
+        self._sprite_memory.set_state(sprite_memory)
+        self._sprites_palettes[:] = sprites_palettes
+        self.pixel_background[:] = numpy.fromstring(pixel_background, dtype=numpy.uint8).reshape(self.pixel_background.shape)
+
+        # La CHR-RAM puede haber cambiado. Con CHR-ROM los tiles sólo dependen de la ROM
+        if self._mapper.get_chr_count() == 0:
+            self._tiles_cache.reset()
+
+        # Se vuelven a cargar los sprites con el registro de control y las paletas del final del frame
+        loaded = SpriteMemory()
+        loaded.set_state(sprites)
+
+        reg_control_1 = self._reg_control_1
+        palettes = self._memory.get_palettes()
+        current_palettes = bytearray(palettes)
+
+        self._reg_control_1 = self._sprites_control_1
+        palettes[:] = self._sprites_palettes
+        self._load_sprites(loaded)
+
+        self._reg_control_1 = reg_control_1
+        palettes[:] = current_palettes
 
 
     #######################################################################
@@ -890,6 +976,9 @@ class PPU(object):
                        (0x00, 0x00, 0x00),    #0x3E
                        (0x00, 0x00, 0x00)]    #0x3F
 
+    # La misma paleta precalculada en formato ARGB de 32 bits, que es como la recibe el motor gráfico
+    _ARGB_PALETTE = list(0xFF000000 | r << 16 | g << 8 | b for (r, g, b) in _COLOR_PALETTE)
+
 
 
 
@@ -23,11 +23,33 @@ class PPUMemory(object):
     ADDR_SPRITE_PALETTE = 0x3F10
 
 
+    # Bancos físicos de 1KB que se ven en cada una de las 4 name tables (0x2000,
+    # 0x2400, 0x2800 y 0x2C00) según el modo de mirroring del mapper:
+    # 0x0: horizontal; 0x1: vertical: 0x2: single; 0x3: 4-screen
+    NAME_TABLE_MIRRORING = [
+        (0, 0, 1, 1),
+        (0, 1, 0, 1),
+        (0, 0, 0, 0),
+        (0, 1, 2, 3),
+    ]
+
+    NAME_TABLE_SIZE = 0x0400
+
+
     def __init__(self, ppu, mapper):
         #######################################################################
         # Variables de instancia
         #######################################################################
-        self._memory = [0x00] * 0x10000
+        # Memoria física de las name tables y attribute tables. La NES sólo tiene
+        # 2KB; los otros 2 se usan únicamente con 4-screen mirroring
+        self._name_table_ram = [bytearray(PPUMemory.NAME_TABLE_SIZE) for n in range(4)]
+
+        # Tabla de indirección: banco físico de cada una de las 4 name tables
+        self._name_tables = [None] * 4
+        self._mirror_mode = None
+
+        # Paletas de imagen y de sprites (0x3F00-0x3F1F)
+        self._palettes = bytearray(0x20)
 
         # Referencia a la PPU
         self._ppu = ppu
@@ -36,168 +58,88 @@ class PPUMemory(object):
         #######################################################################
         #######################################################################
 
+        self.update_mirroring()
+
+
+    # Actualiza la tabla de indirección de las name tables si el mapper ha cambiado
+    # el modo de mirroring
+    def update_mirroring(self):
+        mode = self._mapper.mirror_mode()
+        if mode != self._mirror_mode:
+            self._mirror_mode = mode
+            banks = PPUMemory.NAME_TABLE_MIRRORING[mode]
+            for n in range(4):
+                self._name_tables[n] = self._name_table_ram[banks[n]]
+
+
+    # Devuelve la tabla de indirección de las name tables. Se modifica en el sitio
+    # cuando cambia el mirroring
+    def get_name_tables(self):
+        return self._name_tables
+
+
+    # Devuelve la memoria de las paletas (0x3F00-0x3F1F)
+    def get_palettes(self):
+        return self._palettes
+
+
+    # Devuelve el estado de la memoria en binario: los 2KB de name tables físicas (4KB
+    # con 4-screen mirroring) y las paletas. La memoria CHR es del mapper
+    def get_state(self):
+        count = 4 if self._mirror_mode == 3 else 2
+        return str(bytearray().join(self._name_table_ram[0:count] + [self._palettes]))
+
+
+    # Restaura el estado devuelto por get_state. Se escribe en los bancos existentes, ya
+    # que la tabla de indirección y el BackgroundRenderer los referencian
+    def set_state(self, data):
+        size = PPUMemory.NAME_TABLE_SIZE
+        count = (len(data) - len(self._palettes)) / size
+        for n in range(count):
+            self._name_table_ram[n][:] = data[n * size:(n + 1) * size]
+
+        self._palettes[:] = data[count * size:]
+        self.update_mirroring()
+
 
     #Lee un dato de la memoria de la PPU:
     def read_data(self, addr):
-        a = addr & 0xFFFF
-        d = 0x00
+        a = addr & 0x3FFF
 
         if a < 0x2000:
             d = self._mapper.read_chr(a)
-        elif 0x2000 <= a < 0x4000:
-            d = self._memory[a]
+        # Name tables y attribute tables, con sus mirrors en 0x3000-0x3EFF
+        elif a < 0x3F00:
+            d = self._name_tables[(a >> 10) & 0x03][a & 0x03FF]
+        # Paletas y sus mirrors
         else:
-            self.read_data(a & 0x3FFF)
+            d = self._palettes[a & 0x1F]
 
         return d
 
 
     # Escribe un dato en la memoria de la PPU
     def write_data(self, data, addr):
-        a = addr & 0xFFFF
+        a = addr & 0x3FFF
         d = data & 0xFF
 
         # Pattern tables:
-        if (0x0000 <= a <= 0x1FFF) and self._mapper.get_chr_count() == 0:
-            self._mapper.write_chr(d, a)
-            # reseteamos la cache de Tiles por si hay un cambio de banco en el Mapper
-            self._ppu.reset_tiles_cache()
-        # Name tables y attribute tables:
-        elif 0x2000 <= a < 0x4000:
-            # Name Table 0
-            if 0x2000 <= a < 0x2400:
-                if self._mapper.mirror_mode() == 0:
-                    self._set_memory(d, a + 0x0400)
-                    # Mirrors
-                    self._set_memory(d, a + 0x1000)
-                    self._set_memory(d, a + 0x1400)
-                elif self._mapper.mirror_mode() == 1:
-                    self._set_memory(d, a + 0x0800)
-                    # Mirrors
-                    self._set_memory(d, a + 0x1000)
-                    self._set_memory(d, a + 0x1800)
-                elif self._mapper.mirror_mode() == 2:
-                    self._set_memory(d, a + 0x0400)
-                    self._set_memory(d, a + 0x0800)
-                    # Mirrors
-                    self._set_memory(d, a + 0x1000)
-                    self._set_memory(d, a + 0x1400)
-                    self._set_memory(d, a + 0x1800)
-
-                # Escribimos en la posición indicada
-                self._set_memory(d, a)
-            # Name Table 1
-            elif 0x2400 <= a < 0x2800:
-                if self._mapper.mirror_mode() == 0:
-                    self._set_memory(d, a - 0x0400)
-                    # Mirrors
-                    self._set_memory(d, a + 0x1000)
-                    self._set_memory(d, a + 0x0C00)
-                elif self._mapper.mirror_mode() == 1:
-                    self._set_memory(d, a + 0x0800)
-                    # Mirrors
-                    self._set_memory(d, a + 0x1000)
-                    if a < 0x2700:
-                        self._set_memory(d, a + 0x1800)
-                elif self._mapper.mirror_mode() == 2:
-                    self._set_memory(d, a - 0x0400)
-                    self._set_memory(d, a + 0x0800)
-                    # Mirrors
-                    self._set_memory(d, a + 0x1000)
-                    self._set_memory(d, a + 0x0C00)
-                    if a < 0x2700:
-                        self._set_memory(d, a + 0x1800)
-
-                # Escribimos en la posición indicada
-                self._set_memory(d, a)
-            # Name Table 2
-            elif 0x2800 <= a < 0x2C00:
-                if self._mapper.mirror_mode() == 0:
-                    self._set_memory(d, a + 0x0400)
-                    # Mirrors
-                    self._set_memory(d, a + 0x1000)
-                    if a < 0x2B00:
-                        self._set_memory(d, a + 0x1400)
-                elif self._mapper.mirror_mode() == 1:
-                    self._set_memory(d, a - 0x0800)
-                    # Mirrors
-                    self._set_memory(d, a + 0x1000)
-                    self._set_memory(d, a + 0x0800)
-                elif self._mapper.mirror_mode() == 2:
-                    self._set_memory(d, a + 0x0400)
-                    self._set_memory(d, a - 0x0800)
-                    # Mirrors
-                    self._set_memory(d, a + 0x1000)
-                    if a < 0x2B00:
-                        self._set_memory(d, a + 0x1400)
-                    self._set_memory(d, a + 0x0800)
-
-                # Escribimos en la posición indicada
-                self._set_memory(d, a)
-            # Name Table 3
-            elif 0x2C00 <= a < 0x3000:
-                if self._mapper.mirror_mode() == 0:
-                    self._set_memory(d, a - 0x0400)
-                    # Mirrors
-                    if a < 0x2F00:
-                        self._set_memory(d, a + 0x1000)
-                    self._set_memory(d, a + 0x0C00)
-                elif self._mapper.mirror_mode() == 1:
-                    self._set_memory(d, a - 0x0800)
-                    # Mirrors
-                    if a < 0x2F00:
-                        self._set_memory(d, a + 0x1000)
-                    self._set_memory(d, a + 0x0800)
-                elif self._mapper.mirror_mode() == 2:
-                    self._set_memory(d, a - 0x0400)
-                    self._set_memory(d, a - 0x0800)
-                    # Mirrors
-                    if a < 0x2F00:
-                        self._set_memory(d, a + 0x1000)
-                    self._set_memory(d, a + 0x0C00)
-                    self._set_memory(d, a + 0x0800)
-
-                # Escribimos en la posición indicada
-                self._set_memory(d, a)
-            # Mirrors Name Tables y Attr Tables
-            elif 0x3000 <= a < 0x3F00:
-                self.write_data(d, a - 0x1000)
-            # Paletas
-            elif 0x3F00 <= a < 0x3F20:
-                # Si se escribe en el elemento de background o su mirror se escribe el valor de background
-                # en todas las paletas mod 4 (pero no al contrario)
-                if a == 0x3F00 or a == 0x3F10:
-                    for x in xrange(0x3F00, 0x4000, 0x04):
-                        self._set_memory(d, x)
-                # Si no es un elemento de background escribimos normalmente la paleta
-                elif a & 0x03 != 0:
-                    # Escribe en mirrors
-                    self._set_memory(d, a + 0x0020)
-                    self._set_memory(d, a + 0x0040)
-                    self._set_memory(d, a + 0x0060)
-                    self._set_memory(d, a + 0x0080)
-                    self._set_memory(d, a + 0x00A0)
-                    self._set_memory(d, a + 0x00C0)
-                    self._set_memory(d, a + 0x00E0)
-
-                    # Escribimos en la posición indicada
-                    self._set_memory(d, a)
-            # Mirrors paletas
-            elif 0x3F20 <= a < 0x4000:
-                self.write_data(d, ((a - 0x3F20) % 0x0020) + 0x3F00)
-
-        # Mirrors generales
-        elif a >= 0x4000:
-            self.write_data(d, a & 0x3FFF)
-
-
-    # Funciones de ayuda
-
-    # Establece el valor de una posición de memoria con los mirrors
-    def _set_memory(self, d, addr):
-        a = addr & 0x3FFF
-        self._memory[a] = d
-        self._memory[a + 0x4000] = d
-        self._memory[a + 0x8000] = d
-        self._memory[a + 0xC000] = d
-
+        if a < 0x2000:
+            # Sólo se invalida el tile si el byte de CHR-RAM cambia realmente
+            if self._mapper.get_chr_count() == 0 and self._mapper.read_chr(a) != d:
+                self._mapper.write_chr(d, a)
+                self._ppu.invalidate_tile(a)
+        # Name tables y attribute tables, con sus mirrors en 0x3000-0x3EFF
+        elif a < 0x3F00:
+            self._name_tables[(a >> 10) & 0x03][a & 0x03FF] = d
+        # Paletas y sus mirrors
+        else:
+            a &= 0x1F
+            # Si se escribe en el elemento de background o su mirror se escribe el valor de background
+            # en todas las paletas mod 4 (pero no al contrario)
+            if a == 0x00 or a == 0x10:
+                for x in xrange(0x00, 0x20, 0x04):
+                    self._palettes[x] = d
+            # Si no es un elemento de background escribimos normalmente la paleta
+            elif a & 0x03 != 0:
+                self._palettes[a] = d
@@ -5,6 +5,11 @@ from PPUMemory import PPUMemory
 # Clase que implmenta la info de un sprite de la ram de sprites
 class Sprite(object):
 
+    # Tiles vacíos que usan todos los sprites hasta que se cargan. Los tiles nunca se
+    # modifican, se sustituyen, así que se pueden compartir
+    _EMPTY_TILE_INDEX = [[0] * 8 for x in range(8)]
+    _EMPTY_TILE_ARGB = [[0xFF000000] * 8 for x in range(8)]
+
     def __init__(self, ppu):
         #######################################################################
         # Variables de instancia
@@ -18,21 +23,10 @@ class Sprite(object):
         self._ppu = ppu
 
         # Estos sólo se usan de forma temporal si los srpites son de 16 bits
-        self._tile_sprite_index_0 = [None] * 8
-        for x in range(8):
-            self._tile_sprite_index_0[x] = [0] * 8
-
-        self._tile_sprite_index_1 = [None] * 8
-        for x in range(8):
-            self._tile_sprite_index_1[x] = [0] * 8
-
-        self._tile_sprite_rgb_0 = [None] * 8
-        for x in range(8):
-            self._tile_sprite_rgb_0[x] = [(0, 0, 0)] * 8
-
-        self._tile_sprite_rgb_1 = [None] * 8
-        for x in range(8):
-            self._tile_sprite_rgb_1[x] = [(0, 0, 0)] * 8
+        self._tile_sprite_index_0 = Sprite._EMPTY_TILE_INDEX
+        self._tile_sprite_index_1 = Sprite._EMPTY_TILE_INDEX
+        self._tile_sprite_argb_0 = Sprite._EMPTY_TILE_ARGB
+        self._tile_sprite_argb_1 = Sprite._EMPTY_TILE_ARGB
 
         #######################################################################
 
@@ -55,7 +49,7 @@ class Sprite(object):
             pattern_table = self._ppu.control_1_sprites_pattern_bit_3()
 
             # Obtenemos el tile
-            self._tile_sprite_index_0, self._tile_sprite_rgb_0 = self._ppu.fetch_pattern(pattern_table, self.get_index(), self.get_attr_color(), PPUMemory.ADDR_SPRITE_PALETTE)
+            self._tile_sprite_index_0, self._tile_sprite_argb_0 = self._ppu.fetch_pattern(pattern_table, self.get_index(), self.get_attr_color(), PPUMemory.ADDR_SPRITE_PALETTE)
 
         # Si los sprites son 8x16
         else:
@@ -63,12 +57,12 @@ class Sprite(object):
             index = self._index & 0xFE
 
             # Obtenemos los tiles
-            self._tile_sprite_index_0, self._tile_sprite_rgb_0 = self._ppu.fetch_pattern(pattern_table, index, self.get_attr_color(), PPUMemory.ADDR_SPRITE_PALETTE)
-            self._tile_sprite_index_1, self._tile_sprite_rgb_1 = self._ppu.fetch_pattern(pattern_table, index + 1, self.get_attr_color(), PPUMemory.ADDR_SPRITE_PALETTE)
+            self._tile_sprite_index_0, self._tile_sprite_argb_0 = self._ppu.fetch_pattern(pattern_table, index, self.get_attr_color(), PPUMemory.ADDR_SPRITE_PALETTE)
+            self._tile_sprite_index_1, self._tile_sprite_argb_1 = self._ppu.fetch_pattern(pattern_table, index + 1, self.get_attr_color(), PPUMemory.ADDR_SPRITE_PALETTE)
 
 
     def get_tiles(self):
-        return (self._tile_sprite_index_0, self._tile_sprite_rgb_0), (self._tile_sprite_index_1, self._tile_sprite_rgb_1)
+        return (self._tile_sprite_index_0, self._tile_sprite_argb_0), (self._tile_sprite_index_1, self._tile_sprite_argb_1)
 
 
     def load_by_number(self, sprite_memory, sprite_number):
@@ -87,6 +81,11 @@ class Sprite(object):
     def get_index(self):
         return self._index
 
+
+    # Devuelve los 4 bytes de la memoria de sprites de los que se ha cargado el sprite
+    def get_data(self):
+        return [(self._offset_y - 1) & 0xFF, self._index, self._attributes, self._offset_x]
+
     # Indica si el sprite aparece en el pixel de pantalla indicado
     def is_in(self, x, y, size_bit):
         size_y = size_bit * 8 + 8
@@ -13,4 +13,12 @@ class SpriteMemory(object):
     def write_data(self, data, addr):
         a = addr & 0xFF
         d = data & 0xFF
-        self._memory[a] = d
\ No newline at end of file
+        self._memory[a] = d
+
+    # Devuelve el contenido de la memoria de sprites en binario
+    def get_state(self):
+        return str(bytearray(self._memory))
+
+    # Restaura el contenido devuelto por get_state
+    def set_state(self, data):
+        self._memory[:] = bytearray(data)
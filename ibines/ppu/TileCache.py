@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+import numpy
+
+"""
+TileCache
+
+Descripción: Cache de tiles decodificados que se mantiene entre frames. Cada
+tile se identifica por el banco de 1KB de memoria CHR en el que está y su
+posición dentro de él, no por la pattern table desde la que se ve, así que los
+cambios de banco del mapper no invalidan nada. Sólo hay que invalidar un tile
+cuando cambian sus bytes en CHR-RAM.
+Los tiles se guardan como índices de 2 bits (los dos bitplanes combinados), sin
+color: la paleta se aplica aparte en cada uso.
+"""
+class TileCache(object):
+
+    # Tiles en un banco de 1KB
+    BANK_TILES = 64
+
+    def __init__(self, memory, mapper):
+        #######################################################################
+        # Variables de instancia
+        #######################################################################
+        # Memoria de la PPU de la que se leen los tiles
+        self._memory = memory
+
+        # Banco de 1KB que se ve en cada 1KB de las pattern tables. El mapper la modifica en el sitio
+        self._chr_banks = mapper.get_chr_banks()
+
+        count = mapper.get_chr_bank_count() * TileCache.BANK_TILES
+
+        # Tiles decodificados: [id][y][x] con valores 0-3
+        self._tiles = numpy.zeros((count, 8, 8), dtype=numpy.uint8)
+        self._decoded = [False] * count
+
+        # Tiles en forma de listas [x][y] para el dibujado pixel a pixel
+        self._columns = {}
+        #######################################################################
+        #######################################################################
+
+
+    # Devuelve el identificador del tile "index" de la pattern table "pattern_table"
+    # con los bancos CHR seleccionados actualmente
+    def tile_id(self, pattern_table, index):
+        return (self._chr_banks[(pattern_table << 2) | (index >> 6)] << 6) | (index & 0x3F)
+
+
+    # Devuelve la tabla de tiles decodificados indexada por identificador
+    def get_tiles(self):
+        return self._tiles
+
+
+    # Devuelve la lista que indica qué identificadores están decodificados
+    def get_decoded(self):
+        return self._decoded
+
+
+    # Devuelve la tabla de bancos CHR de las pattern tables
+    def get_chr_banks(self):
+        return self._chr_banks
+
+
+    # Decodifica, si no lo está ya, el tile "index" de la pattern table "pattern_table" y
+    # devuelve su identificador
+    def decode(self, pattern_table, index):
+        tile = self.tile_id(pattern_table, index)
+
+        if not self._decoded[tile]:
+            addr = (pattern_table << 12) | (index << 4)
+            data = numpy.array([self._memory.read_data(a) for a in xrange(addr, addr + 16)], dtype=numpy.uint8)
+            planes = numpy.unpackbits(data).reshape(2, 8, 8)
+
+            self._tiles[tile] = planes[0] | (planes[1] << 1)
+            self._decoded[tile] = True
+
+        return tile
+
+
+    # Devuelve el tile como listas [x][y] de índices de 2 bits
+    def get_columns(self, pattern_table, index):
+        tile = self.decode(pattern_table, index)
+
+        columns = self._columns.get(tile)
+        if columns is None:
+            columns = self._tiles[tile].T.tolist()
+            self._columns[tile] = columns
+
+        return columns
+
+
+    # Invalida el tile que contiene la dirección "addr" de las pattern tables
+    def invalidate(self, addr):
+        tile = self.tile_id(addr >> 12, (addr >> 4) & 0xFF)
+        self._decoded[tile] = False
+        self._columns.pop(tile, None)
+
+
+    # Invalida todos los tiles
+    def reset(self):
+        self._decoded[:] = [False] * len(self._decoded)
+        self._columns.clear()
+
+
+    # Pasa a usar los tiles decodificados de "tiles_cache", de otra instancia con la misma
+    # ROM. Sólo tiene sentido con CHR-ROM, ya que la CHR-RAM es propia de cada instancia
+    def share(self, tiles_cache):
+        self._tiles = tiles_cache._tiles
+        self._decoded = tiles_cache._decoded
+        self._columns = tiles_cache._columns
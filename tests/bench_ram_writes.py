@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+# Micro-benchmark de escritura en RAM sobre la traza de nestest.nes.
+#
+# Ejecuta nestest en modo automático (PC = 0xC000) hasta el primer opcode no
+# oficial, guardando todas las escrituras de la CPU en la RAM (0x0000-0x1FFF),
+# y después las reproduce:
+#   - "mirror x4": escritura antigua, que replicaba el dato en los 4 espejos
+#   - "2KB": Memory.write_data actual, con un único almacén direccionado con addr & 0x7FF
+#
+# Uso (desde el directorio tests):
+#   python bench_ram_writes.py [repeticiones]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ibines"))
+
+from NES import NES
+
+
+# Escritura en RAM tal y como se hacía antes, con los 4 espejos en memoria
+class MirrorMemory(object):
+
+    def __init__(self):
+        self._memory = [0x00] * 0x10000
+
+    def write_data(self, data, addr):
+        d = data & 0xFF
+        addr = addr & 0xFFFF
+
+        if addr >= 0x0000 and addr < 0x2000:
+            n = addr & 0x7FF
+            self._memory[n] = d
+            self._memory[0x0800 + n] = d
+            self._memory[0x1000 + n] = d
+            self._memory[0x1800 + n] = d
+
+
+# Ejecuta la traza de nestest y devuelve la lista de escrituras (dato, dirección) en RAM
+def record_ram_writes(rom_file):
+    nes = NES(rom_file, headless=True)
+    mem = nes._memory
+    cpu = nes._cpu
+    cpu._reg_pc = 0xC000
+    cpu._reg_sp = 0xFD
+    cpu._reg_p = 0x24
+
+    writes = []
+    write_data = mem.write_data
+
+    def recording_write(data, addr):
+        if addr < 0x2000:
+            writes.append((data, addr))
+        write_data(data, addr)
+
+    mem.write_data = recording_write
+
+    try:
+        while True:
+            nes.step()
+    except KeyError:
+        # Primer opcode no oficial: fin de la parte de la traza soportada
+        pass
+
+    del mem.write_data
+    return nes, writes
+
+
+# Devuelve las escrituras por segundo de la mejor de 5 pasadas
+def bench(name, func, writes, repeat):
+    t = None
+    for n in range(5):
+        t0 = time.time()
+        for i in xrange(repeat):
+            for data, addr in writes:
+                func(data, addr)
+        t0 = time.time() - t0
+        if t is None or t0 < t:
+            t = t0
+
+    n = len(writes) * repeat
+    print "%-12s %10.0f escrituras/s" % (name, n / t)
+
+    return n / t
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rom_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nestest.nes")
+
+    nes, writes = record_ram_writes(rom_file)
+    print "nestest: %d escrituras en RAM, %d repeticiones" % (len(writes), repeat)
+
+    old = bench("mirror x4", MirrorMemory().write_data, writes, repeat)
+    new = bench("2KB", nes._memory.write_data, writes, repeat)
+
+    print "mejora: x%.2f" % (new / old)
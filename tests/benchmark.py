@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+# Benchmark de rendimiento del emulador con salida en JSON.
+#
+# Ejecuta sin ventana un número fijo de frames de cada ROM incluida en el
+# repositorio (roms/*.nes, tests/nestest.nes y tests/instr_test-v4/**/*.nes) y
+# mide:
+#   - frames por segundo emulados
+#   - instrucciones de CPU por segundo
+#   - scanlines de la PPU por segundo
+#   - pico de memoria residente (RSS) del proceso
+#   - RSS al terminar, separado en memoria anónima (propia del proceso) y páginas
+#     de ficheros (compartidas con otros procesos, p. ej. la ROM con --mmap)
+# Cada ROM se ejecuta en un proceso aparte para que el pico de RSS sea sólo suyo.
+#
+# Uso (desde cualquier directorio):
+#   python benchmark.py [-f frames] [-o salida.json] [--reference-cpu] [--mmap] [rom ...]
+
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(TESTS_DIR, "..")
+
+sys.path.insert(0, os.path.join(ROOT_DIR, "ibines"))
+
+
+# Devuelve las ROMs del benchmark, relativas a la raíz del repositorio
+def default_roms():
+    patterns = ["roms/*.nes", "tests/nestest.nes", "tests/instr_test-v4/*.nes", "tests/instr_test-v4/rom_singles/*.nes"]
+
+    roms = []
+    for pattern in patterns:
+        roms += sorted(os.path.relpath(f, ROOT_DIR) for f in glob.glob(os.path.join(ROOT_DIR, pattern)))
+
+    return roms
+
+
+# Devuelve el RSS actual del proceso en KB separado en {"rss_anon_kb", "rss_file_kb"}
+# según /proc/self/status. Fuera de Linux devuelve un diccionario vacío
+def current_rss():
+    fields = {"RssAnon:": "rss_anon_kb", "RssFile:": "rss_file_kb"}
+    rss = {}
+    try:
+        for line in open("/proc/self/status"):
+            parts = line.split()
+            if parts and parts[0] in fields:
+                rss[fields[parts[0]]] = int(parts[1])
+    except IOError:
+        pass
+
+    return rss
+
+
+# Ejecuta "frames" frames de la ROM y devuelve el diccionario de resultados
+def bench_rom(rom, frames, fast_cpu, use_mmap=False):
+    from NES import NES
+    from ROM import ROM
+
+    result = {"rom": rom, "frames": 0, "error": None}
+
+    try:
+        nes = NES(None, headless=True, fast_cpu=fast_cpu, rom=ROM(os.path.join(ROOT_DIR, rom), use_mmap))
+    except Exception as e:
+        result["error"] = "%s: %s" % (type(e).__name__, e)
+        return result
+
+    ppu = nes._ppu
+
+    t = time.time()
+    try:
+        nes.run_frames(frames)
+    except Exception as e:
+        result["error"] = "%s: %s" % (type(e).__name__, e)
+    t = time.time() - t
+
+    result["frames"] = nes.get_frame_count()
+    result["seconds"] = round(t, 3)
+    result["fps"] = round(nes.get_frame_count() / t, 2)
+    result["instructions"] = nes.get_total_instructions()
+    result["instructions_per_second"] = int(nes.get_total_instructions() / t)
+    result["cpu_cycles"] = nes.get_total_cycles()
+    result["scanlines"] = ppu.get_scanline_count()
+    result["scanlines_per_second"] = int(ppu.get_scanline_count() / t)
+
+    # En Linux ru_maxrss está en KB
+    result["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result.update(current_rss())
+
+    return result
+
+
+# Devuelve el commit actual del repositorio, si lo hay
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR,
+                                       stderr=open(os.devnull, "w")).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de ibines con salida en JSON")
+    parser.add_argument("roms", nargs="*", help="ROMs a ejecutar (por defecto todas las del repositorio)")
+    parser.add_argument("-f", "--frames", type=int, default=60, help="frames por ROM")
+    parser.add_argument("-o", "--output", help="fichero JSON de salida (por defecto la salida estándar)")
+    parser.add_argument("--reference-cpu", action="store_true", help="usar la CPU de referencia en lugar de FastCPU")
+    parser.add_argument("--mmap", action="store_true", help="proyectar las ROMs en memoria en lugar de leerlas")
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    fast_cpu = not args.reference_cpu
+
+    # Proceso hijo: una sola ROM, resultado en una línea JSON
+    if args.single:
+        print json.dumps(bench_rom(args.roms[0], args.frames, fast_cpu, args.mmap))
+        return
+
+    results = []
+    for rom in args.roms or default_roms():
+        cmd = [sys.executable, os.path.abspath(__file__), "--single", "-f", str(args.frames), rom]
+        if args.reference_cpu:
+            cmd.append("--reference-cpu")
+        if args.mmap:
+            cmd.append("--mmap")
+
+        output = subprocess.check_output(cmd, cwd=ROOT_DIR)
+        result = json.loads(output.strip().splitlines()[-1])
+        results.append(result)
+
+        if "fps" in result:
+            sys.stderr.write("%-60s %7.2f fps %10d inst/s %7d KB\n" % (rom, result["fps"], result["instructions_per_second"],
+                                                                      result["peak_rss_kb"]))
+        if result["error"]:
+            sys.stderr.write("%-60s %s\n" % (rom, result["error"]))
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_implementation() + " " + platform.python_version(),
+        "cpu": "reference" if args.reference_cpu else "fast",
+        "mmap": args.mmap,
+        "frames": args.frames,
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        f = open(args.output, "w")
+        f.write(text + "\n")
+        f.close()
+    else:
+        print text
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+# Ejecuta sin ventana las ROMs de test de instrucciones de blargg (instr_test-v4)
+# y lee su resultado con el protocolo estándar de estos tests en 0x6000:
+#   0x6001-0x6003 -> firma DE B0 61 cuando los datos son válidos
+#   0x6000        -> estado: 0x80 en ejecución, 0x81 pide un reset, 0x00-0x7F
+#                    resultado final (0x00 es que ha pasado)
+#   0x6004-       -> texto de salida terminado en 0x00
+# Las ROMs se reparten entre varios procesos.
+#
+# Uso (desde cualquier directorio):
+#   python instr_test_runner.py [-j procesos] [-f frames] [--reference-cpu] [-v] [rom ...]
+#
+# Sin ROMs ejecuta los 16 tests de rom_singles. Devuelve 0 si pasan todos
+
+import argparse
+import glob
+import multiprocessing
+import os
+import sys
+import time
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "ibines"))
+
+from NES import NES
+
+
+STATUS_ADDR = 0x6000
+SIGNATURE_ADDR = 0x6001
+TEXT_ADDR = 0x6004
+
+SIGNATURE = (0xDE, 0xB0, 0x61)
+
+STATUS_RUNNING = 0x80
+STATUS_RESET = 0x81
+
+# Frames que se espera antes de pulsar reset (el test pide al menos 100 ms)
+RESET_DELAY_FRAMES = 6
+
+
+# Devuelve el texto de salida del test
+def read_text(nes):
+    chars = []
+    addr = TEXT_ADDR
+    while addr < 0x8000:
+        d = nes._memory.read_data(addr)
+        if d == 0x00:
+            break
+        chars.append(chr(d))
+        addr += 1
+
+    return "".join(chars)
+
+
+# Ejecuta una ROM hasta que termina el test o se acaban los frames. Devuelve un
+# diccionario con el estado final ("status", None si no ha terminado), el texto,
+# el error del emulador si lo hay, los frames y el tiempo
+def run_test(args):
+    rom, frames, fast_cpu = args
+    result = {"rom": rom, "status": None, "text": "", "error": None, "frames": 0, "time": 0.0}
+    t = time.time()
+
+    nes = None
+    try:
+        nes = NES(rom, headless=True, fast_cpu=fast_cpu)
+        mem = nes._memory
+        reset_frame = None
+
+        while nes.get_frame_count() < frames:
+            nes.step_frame()
+
+            signature = (mem.read_data(SIGNATURE_ADDR), mem.read_data(SIGNATURE_ADDR + 1), mem.read_data(SIGNATURE_ADDR + 2))
+            if signature != SIGNATURE:
+                continue
+
+            status = mem.read_data(STATUS_ADDR)
+            if status == STATUS_RESET:
+                if reset_frame is None:
+                    reset_frame = nes.get_frame_count() + RESET_DELAY_FRAMES
+                elif nes.get_frame_count() >= reset_frame:
+                    nes.reset()
+                    reset_frame = None
+            elif status != STATUS_RUNNING:
+                result["status"] = status
+                break
+
+    except Exception as e:
+        result["error"] = "%s: %s" % (type(e).__name__, e)
+
+    # También si el emulador ha fallado, el texto indica hasta dónde ha llegado el test
+    if nes is not None:
+        result["frames"] = nes.get_frame_count()
+        if nes._memory.read_data(SIGNATURE_ADDR) == SIGNATURE[0]:
+            result["text"] = read_text(nes)
+
+    result["time"] = time.time() - t
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ejecuta los tests instr_test-v4 de blargg sin ventana")
+    parser.add_argument("roms", nargs="*", help="ROMs de test (por defecto las 16 de rom_singles)")
+    parser.add_argument("-j", "--jobs", type=int, default=multiprocessing.cpu_count(), help="número de procesos")
+    parser.add_argument("-f", "--frames", type=int, default=3000, help="máximo de frames por ROM")
+    parser.add_argument("--reference-cpu", action="store_true", help="usar la CPU de referencia en lugar de FastCPU")
+    parser.add_argument("-v", "--verbose", action="store_true", help="mostrar el texto de salida de cada test")
+    args = parser.parse_args()
+
+    roms = args.roms or sorted(glob.glob(os.path.join(TESTS_DIR, "instr_test-v4", "rom_singles", "*.nes")))
+    jobs = [(rom, args.frames, not args.reference_cpu) for rom in roms]
+
+    t = time.time()
+    pool = multiprocessing.Pool(min(args.jobs, len(jobs)))
+    try:
+        results = pool.map(run_test, jobs, 1)
+    finally:
+        pool.close()
+        pool.join()
+    t = time.time() - t
+
+    passed = 0
+    for result in results:
+        name = os.path.basename(result["rom"])
+
+        if result["status"] == 0x00:
+            passed += 1
+            verdict = "ok"
+        elif result["error"]:
+            verdict = "FALLO (%s)" % result["error"]
+        elif result["status"] is None:
+            verdict = "FALLO (sin resultado en %d frames)" % result["frames"]
+        else:
+            verdict = "FALLO (código %d)" % result["status"]
+
+        print "%-24s %5d frames %6.1f s  %s" % (name, result["frames"], result["time"], verdict)
+
+        # Los tests que fallan explican en el texto qué instrucción ha fallado
+        if args.verbose or result["status"] != 0x00:
+            for line in result["text"].strip().splitlines():
+                print "    " + line
+
+    print "%d/%d tests pasados en %.1f s" % (passed, len(results), t)
+
+    return 0 if passed == len(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
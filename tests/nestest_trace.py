@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+# Verificación de la CPU con la traza de nestest.
+#
+# Ejecuta nestest.nes en modo automático (desde 0xC000) y compara el estado de
+# la CPU antes de cada instrucción con la línea correspondiente de nestest.log:
+# PC, opcode, A, X, Y, P, SP y, opcionalmente, los ciclos (columna CYC/SL, con
+# la CPU en el modo de ciclos exactos). Se para en la primera diferencia e
+# indica qué campo no coincide. El log se lee línea a línea y el estado del
+# emulador sólo se formatea si hay diferencias.
+#
+# Por defecto se para con éxito al llegar a la primera instrucción no oficial
+# (marcada con '*' en el log), que el emulador no implementa.
+#
+# Uso (desde cualquier directorio):
+#   python nestest_trace.py [--reference-cpu] [--cycles] [--unofficial] [-v]
+#
+# Devuelve 0 si la traza coincide y 1 si hay alguna diferencia
+
+import argparse
+import os
+import sys
+import time
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "ibines"))
+
+from NES import NES
+
+
+# Ciclos de PPU por scanline y scanlines por frame de la PPU NTSC del log
+LOG_SCANLINE_DOTS = 341
+LOG_FRAME_SCANLINES = 262
+
+FIELDS = ["PC", "OP", "A", "X", "Y", "P", "SP", "CYC"]
+
+
+# Lee nestest.log línea a línea y devuelve tuplas (número de línea, línea, estado esperado, no oficial).
+# El estado es (PC, opcode, A, X, Y, P, SP, ciclos de CPU acumulados desde la primera línea)
+def log_states(log_file):
+    dots = 0
+    prev = None
+
+    for number, line in enumerate(open(log_file), 1):
+        cyc_pos = line.index("CYC:")
+        sl_pos = line.index("SL:")
+        cyc = int(line[cyc_pos + 4:sl_pos])
+        sl = int(line[sl_pos + 3:])
+
+        # La PPU avanza 3 ciclos por ciclo de CPU
+        if prev is not None:
+            dots += ((sl - prev[1]) % LOG_FRAME_SCANLINES) * LOG_SCANLINE_DOTS + cyc - prev[0]
+        prev = (cyc, sl)
+
+        state = (int(line[0:4], 16), int(line[6:8], 16),
+                 int(line[50:52], 16), int(line[55:57], 16), int(line[60:62], 16),
+                 int(line[65:67], 16), int(line[71:73], 16), dots / 3)
+
+        yield number, line, state, line[15] == "*"
+
+
+# Ejecuta nestest.nes y devuelve el estado de la CPU antes de cada instrucción
+def cpu_states(nes):
+    cpu = nes._cpu
+    mem = nes._memory
+
+    cpu._reg_pc = 0xC000
+    cpu._reg_sp = 0xFD
+    cpu._reg_p = 0x24
+
+    cycles = nes.get_total_cycles()
+    while True:
+        pc = cpu._reg_pc
+        yield (pc, mem.read_data(pc), cpu._reg_a, cpu._reg_x, cpu._reg_y, cpu._reg_p, cpu._reg_sp,
+               nes.get_total_cycles() - cycles)
+        nes.step()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara la CPU con nestest.log")
+    parser.add_argument("--reference-cpu", action="store_true", help="usar la CPU de referencia en lugar de FastCPU")
+    parser.add_argument("--cycles", action="store_true", help="comparar también los ciclos de cada instrucción")
+    parser.add_argument("--unofficial", action="store_true", help="seguir con las instrucciones no oficiales")
+    parser.add_argument("-v", "--verbose", action="store_true", help="mostrar las líneas previas a la diferencia")
+    args = parser.parse_args()
+
+    # Los ciclos sólo coinciden con el log en el modo de ciclos exactos
+    nes = NES(os.path.join(TESTS_DIR, "nestest.nes"), headless=True, fast_cpu=not args.reference_cpu,
+              accurate_cycles=args.cycles)
+
+    # Sólo se comparan los bits de P que existen en la CPU (el 4 y el 5 no son registros reales)
+    mask = [0xFFFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xCF, 0xFF, 0xFFFFFFFF]
+    checked = len(FIELDS) if args.cycles else len(FIELDS) - 1
+
+    t = time.time()
+    history = []
+    lines = 0
+    result = 0
+
+    states = cpu_states(nes)
+    previous_line = None
+    for number, line, expected, unofficial in log_states(os.path.join(TESTS_DIR, "nestest.log")):
+        if unofficial and not args.unofficial:
+            print "Primera instrucción no oficial en la línea %d: fin de la comparación" % number
+            break
+
+        # El emulador falla al ejecutar la instrucción de la línea anterior
+        try:
+            got = next(states)
+        except Exception as e:
+            print "Línea %d: error del emulador: %s: %s" % (number - 1, type(e).__name__, e)
+            print "  esperado: " + previous_line.rstrip()
+            result = 1
+            break
+
+        for n in range(checked):
+            if (got[n] & mask[n]) != (expected[n] & mask[n]):
+                if args.verbose:
+                    for previous in history:
+                        print "  " + previous.rstrip()
+
+                # Los ciclos en decimal, como en el log; los registros en hexadecimal
+                value = "%d" if FIELDS[n] == "CYC" else ("%04X" if FIELDS[n] == "PC" else "%02X")
+                print ("Línea %d: no coincide %s: esperado " + value + ", obtenido " + value) % (number, FIELDS[n],
+                                                                                              expected[n], got[n])
+                print "  esperado: " + line.rstrip()
+                print "  obtenido: PC:%04X OP:%02X A:%02X X:%02X Y:%02X P:%02X SP:%02X CYC:%d" % got
+                result = 1
+                break
+
+        if result:
+            break
+
+        if args.verbose:
+            history = (history + [line])[-5:]
+
+        previous_line = line
+        lines += 1
+
+    t = time.time() - t
+    print "%d líneas coinciden en %.2f s" % (lines, t)
+
+    # nestest deja el código del primer fallo de las instrucciones oficiales en 0x02
+    if not result and nes._memory.read_data(0x02):
+        print "nestest informa del error %02X en 0x02" % nes._memory.read_data(0x02)
+        result = 1
+
+    return result
+
+
+if __name__ == "__main__":
+    sys.exit(main())